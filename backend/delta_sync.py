@@ -0,0 +1,92 @@
+"""
+Delta Sync
+Opaque sync tokens and change-page assembly for the mobile client's incremental refresh
+"""
+
+import json
+import base64
+import logging
+from datetime import datetime
+from typing import List, Dict, Optional, Any
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SYNC_TOKEN_VERSION = 1
+
+class InvalidSyncToken(ValueError):
+    pass
+
+def encode_sync_token(change_seq: int) -> str:
+    payload = json.dumps({"v": SYNC_TOKEN_VERSION, "seq": change_seq}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_sync_token(token: Optional[str]) -> int:
+    """
+    Returns the change sequence a client has already seen (0 for a full sync)
+    """
+    if not token:
+        return 0
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload.get("v") != SYNC_TOKEN_VERSION:
+            raise InvalidSyncToken("Unsupported sync token version")
+        return int(payload["seq"])
+    except (ValueError, KeyError, TypeError):
+        raise InvalidSyncToken("Invalid sync token")
+
+def _changed_at(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+def _settled(changed_at: Optional[str], settled_before: Optional[datetime]) -> bool:
+    # Rows without a change time predate the migration's clock stamps and are long settled
+    stamp = _changed_at(changed_at)
+    return settled_before is None or stamp is None or stamp < settled_before
+
+def build_sync_page(since: int, entry_rows: List[Dict[str, Any]], tombstone_rows: List[Dict[str, Any]],
+                    user_row: Dict[str, Any], page_size: int,
+                    settled_before: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Merge changed entries and tombstones (each fetched as up to page_size + 1 rows ordered by change_seq)
+    into one page ordered by change sequence, plus the profile/quiz section if the user row changed
+
+    change_seq is taken before the writing transaction commits, so a lower sequence can still become
+    visible after a higher one. Rows stamped at or after settled_before (database time minus a settle
+    window longer than any write transaction) are returned, but the token stops short of them so the
+    next sync reads from there again; has_more is then false, as the rest isn't safe to page through yet
+    """
+    changes = [("entry", row["change_seq"], row.get("updated_at"), row) for row in entry_rows]
+    changes += [("tombstone", row["change_seq"], row.get("deleted_at"), row) for row in tombstone_rows]
+    changes.sort(key=lambda change: change[1])
+
+    has_more = len(changes) > page_size
+    page = changes[:page_size]
+
+    cursor = since
+    held_back = False
+    for _, change_seq, changed_at, _ in page:
+        if not _settled(changed_at, settled_before):
+            held_back = True
+            break
+        cursor = change_seq
+    user_seq = user_row.get("change_seq") or 0
+    profile_changed = user_seq > since
+    if held_back:
+        has_more = False
+    elif not has_more and _settled(user_row.get("updated_at"), settled_before):
+        # Nothing left to page through: the token can cover the profile change too
+        cursor = max(cursor, user_seq)
+
+    return {
+        "entries": [row for kind, _, _, row in page if kind == "entry"],
+        "deleted": [
+            {"entity": row["entity"], "id": row["entity_id"], "deleted_at": row.get("deleted_at")}
+            for kind, _, _, row in page if kind == "tombstone"
+        ],
+        "profile_changed": profile_changed,
+        "has_more": has_more,
+        "sync_token": encode_sync_token(cursor)
+    }
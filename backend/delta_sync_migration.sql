@@ -0,0 +1,74 @@
+-- Delta Sync Database Schema Migration
+-- Adds a server-side change sequence to synced tables and a tombstone table for deletions
+-- Run in the Supabase SQL editor (contains function bodies, so it can't be split on semicolons)
+
+-- One global, monotonically increasing change sequence shared by all synced tables
+CREATE SEQUENCE IF NOT EXISTS sync_change_seq;
+
+-- Change tracking columns
+ALTER TABLE food_entries ADD COLUMN IF NOT EXISTS change_seq BIGINT;
+ALTER TABLE food_entries ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT NOW();
+ALTER TABLE users ADD COLUMN IF NOT EXISTS change_seq BIGINT;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT NOW();
+
+-- Backfill existing rows so the first sync picks them up
+UPDATE food_entries SET change_seq = nextval('sync_change_seq') WHERE change_seq IS NULL;
+UPDATE users SET change_seq = nextval('sync_change_seq') WHERE change_seq IS NULL;
+
+-- Stamp every insert/update with the next change sequence
+-- updated_at is clock_timestamp() (when the sequence was taken, not when the transaction began): /api/sync
+-- only moves a client's cursor past rows older than a settle window, since a sequence taken before
+-- another transaction's can commit after it
+CREATE OR REPLACE FUNCTION bump_change_seq() RETURNS TRIGGER AS $$
+BEGIN
+    NEW.change_seq := nextval('sync_change_seq');
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS food_entries_change_seq ON food_entries;
+CREATE TRIGGER food_entries_change_seq
+    BEFORE INSERT OR UPDATE ON food_entries
+    FOR EACH ROW EXECUTE FUNCTION bump_change_seq();
+
+DROP TRIGGER IF EXISTS users_change_seq ON users;
+CREATE TRIGGER users_change_seq
+    BEFORE INSERT OR UPDATE ON users
+    FOR EACH ROW EXECUTE FUNCTION bump_change_seq();
+
+-- Tombstones: deletions are recorded so clients can drop their local copies
+CREATE TABLE IF NOT EXISTS sync_tombstones (
+    change_seq BIGINT PRIMARY KEY DEFAULT nextval('sync_change_seq'),
+    user_id UUID NOT NULL,
+    entity VARCHAR(50) NOT NULL,
+    entity_id VARCHAR(64) NOT NULL,
+    deleted_at TIMESTAMPTZ DEFAULT clock_timestamp()
+);
+ALTER TABLE sync_tombstones ALTER COLUMN deleted_at SET DEFAULT clock_timestamp();
+
+-- Database time for the settle window, so app server clock skew doesn't matter
+CREATE OR REPLACE FUNCTION sync_clock() RETURNS TIMESTAMPTZ AS $$
+    SELECT clock_timestamp();
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION record_food_entry_tombstone() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO sync_tombstones (user_id, entity, entity_id) VALUES (OLD.user_id, 'food_entry', OLD.id::text);
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS food_entries_tombstone ON food_entries;
+CREATE TRIGGER food_entries_tombstone
+    AFTER DELETE ON food_entries
+    FOR EACH ROW EXECUTE FUNCTION record_food_entry_tombstone();
+
+-- Sync reads are "this user's rows changed after sequence N, in order"
+CREATE INDEX IF NOT EXISTS idx_food_entries_user_change_seq ON food_entries(user_id, change_seq);
+CREATE INDEX IF NOT EXISTS idx_sync_tombstones_user_change_seq ON sync_tombstones(user_id, change_seq);
+
+-- Comments for documentation
+COMMENT ON COLUMN food_entries.change_seq IS 'Global change sequence, bumped on every insert/update (delta sync cursor)';
+COMMENT ON COLUMN users.change_seq IS 'Global change sequence, bumped on every profile or quiz result update';
+COMMENT ON TABLE sync_tombstones IS 'Deleted rows, returned to clients by /api/sync so they can remove local copies';
@@ -0,0 +1,108 @@
+"""
+Details Prefetch
+Speculatively warms the food details cache for the top search results, within its own low-priority Passio budget
+"""
+
+import os
+import time
+import asyncio
+import logging
+import contextvars
+from typing import Awaitable, Callable, List, Dict, Optional, Any
+
+from cachetools import TTLCache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class DetailsPrefetcher:
+    def __init__(self, enabled: bool = False, top_n: int = 3, calls_per_minute: float = 60.0,
+                 max_concurrency: int = 2, tracking_ttl_seconds: float = 1800.0):
+        self.enabled = enabled
+        self.top_n = top_n
+        self.calls_per_minute = calls_per_minute
+        self.max_concurrency = max_concurrency
+        # Token bucket: prefetches never queue behind it, they're skipped when it's empty
+        self._tokens = calls_per_minute
+        self._refilled_at = time.monotonic()
+        self._running = 0
+        self._tasks: set = set()
+        # food ID -> prefetched, not yet requested
+        self._prefetched = TTLCache(maxsize=10000, ttl=tracking_ttl_seconds)
+        self.prefetched = 0
+        self.used = 0
+        self.skipped_budget = 0
+        self.skipped_cached = 0
+        self.detail_requests = 0
+
+    def _take_token(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(self.calls_per_minute, self._tokens + (now - self._refilled_at) * self.calls_per_minute / 60)
+        self._refilled_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def schedule(self, food_ids: List[str], is_cached: Callable[[str], bool],
+                 fetch: Callable[[str], Awaitable[Optional[Dict[str, Any]]]]):
+        """
+        Prefetch details for the first top_n IDs that aren't cached yet; returns immediately
+        """
+        if not self.enabled:
+            return
+        for food_id in list(dict.fromkeys(food_id for food_id in food_ids if food_id))[:self.top_n]:
+            if food_id in self._prefetched or is_cached(food_id):
+                self.skipped_cached += 1
+                continue
+            if self._running >= self.max_concurrency or not self._take_token():
+                self.skipped_budget += 1
+                continue
+            self._running += 1
+            self._prefetched[food_id] = True
+            # A fresh context: prefetches aren't part of the search request's metrics or trace
+            task = contextvars.Context().run(asyncio.get_running_loop().create_task, self._prefetch(food_id, fetch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _prefetch(self, food_id: str, fetch):
+        try:
+            if await fetch(food_id) is not None:
+                self.prefetched += 1
+            else:
+                self._prefetched.pop(food_id, None)
+        except Exception as e:
+            self._prefetched.pop(food_id, None)
+            logger.debug("Details prefetch failed for %s: %s", food_id, e)
+        finally:
+            self._running -= 1
+
+    def record_request(self, food_id: str):
+        """
+        Call when a user actually opens a food's details, to measure how often prefetches pay off
+        """
+        self.detail_requests += 1
+        if self._prefetched.pop(food_id, None) is not None:
+            self.used += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "top_n": self.top_n,
+            "prefetched": self.prefetched,
+            "used": self.used,
+            # Share of prefetches the user went on to open: the payoff per unit of quota spent
+            "prefetch_hit_rate": round(self.used / self.prefetched, 3) if self.prefetched else None,
+            # Share of detail views that were served warm thanks to a prefetch
+            "coverage": round(self.used / self.detail_requests, 3) if self.detail_requests else None,
+            "skipped_budget": self.skipped_budget,
+            "skipped_cached": self.skipped_cached,
+            "calls_per_minute": self.calls_per_minute
+        }
+
+# Global instance
+details_prefetcher = DetailsPrefetcher(
+    enabled=os.getenv('DETAILS_PREFETCH_ENABLED', 'false').lower() == 'true',
+    top_n=int(os.getenv('DETAILS_PREFETCH_TOP_N', '3')),
+    calls_per_minute=float(os.getenv('DETAILS_PREFETCH_PER_MINUTE', '60'))
+)
@@ -0,0 +1,256 @@
+"""
+Entry Journal
+Durable local write-behind journal for food entries: acknowledge once journaled, flush to Supabase in batches
+"""
+
+import os
+import json
+import time
+import random
+import sqlite3
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, List, Dict, Optional, Tuple, Any
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# _discard_pending result: the entry is in a batch being flushed right now
+_IN_FLIGHT = object()
+
+class EntryJournal:
+    def __init__(self, path: str, enabled: bool = False, batch_size: int = 50, flush_interval_seconds: float = 1.0,
+                 max_backoff_seconds: float = 60.0):
+        self.path = path
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_seconds
+        self.max_backoff = max_backoff_seconds
+        self._db: Optional[sqlite3.Connection] = None
+        # Guards the connection and the in-memory mirror; reads also come from worker threads
+        self._lock = threading.Lock()
+        # user_id -> {entry_id: entry dict} for entries not yet flushed, so reads can merge them
+        self._pending: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._in_flight: set = set()
+        # Entries a flush was attempted for without confirmation: the upsert may still have reached Supabase
+        self._attempted: set = set()
+        self._batch_done: Optional[asyncio.Event] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self.flushed = 0
+        self.failed_flushes = 0
+        self.last_error: Optional[str] = None
+
+    def open(self):
+        """
+        Open (or create) the journal and load entries left over from a previous run
+        """
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        # FULL: an acknowledged entry survives a crash or power loss
+        db.execute("PRAGMA synchronous=FULL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS pending_entries ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT UNIQUE NOT NULL, user_id TEXT NOT NULL, "
+            "payload TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        with self._lock:
+            self._db = db
+            self._pending.clear()
+            self._attempted.clear()
+            for payload, in db.execute("SELECT payload FROM pending_entries ORDER BY seq"):
+                entry = json.loads(payload)
+                self._pending.setdefault(entry["user_id"], {})[entry["id"]] = entry
+                # The previous run may have stopped mid-flush
+                self._attempted.add(entry["id"])
+        if self.pending_count():
+            logger.info("Entry journal recovered %d unflushed entries", self.pending_count())
+
+    def append(self, entry: Dict[str, Any]):
+        """
+        Durably record an entry; blocking (fsync), so call from a worker thread
+        """
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pending_entries (id, user_id, payload, created_at) VALUES (?, ?, ?, ?)",
+                (entry["id"], entry["user_id"], json.dumps(entry, default=str), time.time())
+            )
+            self._pending.setdefault(entry["user_id"], {})[entry["id"]] = entry
+        if self._wake is not None and self.pending_count() >= self.batch_size:
+            # Called from a worker thread; asyncio.Event is only safe to touch from the loop
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def pending_for_user(self, user_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._pending.get(user_id, {}).values())
+
+    def merge(self, user_id: str, rows: List[Dict[str, Any]], start: Optional[str] = None,
+              end: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Add this user's unflushed entries (optionally within [start, end) by timestamp) to rows read from
+        Supabase, skipping any that already made it into the table
+        """
+        pending = self.pending_for_user(user_id) if self.enabled else []
+        if not pending:
+            return rows
+        seen = {row.get("id") for row in rows}
+        merged = list(rows)
+        for entry in pending:
+            timestamp = entry.get("timestamp", "")
+            if entry["id"] in seen or (start and timestamp < start) or (end and timestamp >= end):
+                continue
+            merged.append(entry)
+        return merged
+
+    async def discard(self, user_id: str, entry_id: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Remove an unflushed entry (the user deleted it before it reached the database)
+        Returns (entry, maybe_stored): entry is None if it isn't pending; maybe_stored is True when a flush
+        that timed out or failed may still have written it, so the caller must delete the stored row too
+        If it's mid-flush, waits for that flush to finish first
+        """
+        while True:
+            while entry_id in self._in_flight and self._batch_done is not None:
+                await self._batch_done.wait()
+            result = await asyncio.to_thread(self._discard_pending, user_id, entry_id)
+            if result is not _IN_FLIGHT:
+                return result
+
+    def _discard_pending(self, user_id: str, entry_id: str):
+        # Checked, popped and deleted under one lock hold, so flush_once can't pick the row up in between
+        with self._lock:
+            if entry_id in self._in_flight:
+                return _IN_FLIGHT
+            entry = self._pending.get(user_id, {}).pop(entry_id, None)
+            if entry is None:
+                return None, False
+            if not self._pending[user_id]:
+                del self._pending[user_id]
+            self._db.execute("DELETE FROM pending_entries WHERE id = ?", (entry_id,))
+            maybe_stored = entry_id in self._attempted
+            self._attempted.discard(entry_id)
+        return entry, maybe_stored
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(len(entries) for entries in self._pending.values())
+
+    def start(self, insert_batch: Callable[[List[Dict[str, Any]]], None]):
+        """
+        Start the background flusher; insert_batch must be idempotent (an upsert), since a batch may be
+        retried after the database already applied it
+        """
+        if not self.enabled:
+            return
+        if self._db is None:
+            self.open()
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._batch_done = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._flush_loop(insert_batch))
+
+    async def stop(self, insert_batch: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if insert_batch is not None and self._db is not None:
+            # Last attempt; anything left stays journaled for the next start
+            try:
+                while await self.flush_once(insert_batch):
+                    pass
+            except Exception as e:
+                logger.warning("Entry journal final flush failed, %d entries stay journaled: %s",
+                               self.pending_count(), e)
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+                self._db = None
+
+    async def flush_once(self, insert_batch: Callable[[List[Dict[str, Any]]], None]) -> int:
+        """
+        Flush the oldest batch; returns how many entries were written (raises if the insert fails)
+        """
+        with self._lock:
+            batch = [
+                json.loads(payload) for payload, in self._db.execute(
+                    "SELECT payload FROM pending_entries ORDER BY seq LIMIT ?", (self.batch_size,)
+                )
+            ]
+            ids = [entry["id"] for entry in batch]
+            # Marked under the same lock as the read: discard either removed a row before this, or waits
+            self._in_flight.update(ids)
+            # Until the batch is confirmed and dropped from the journal, it may or may not be in Supabase
+            self._attempted.update(ids)
+        if not batch:
+            return 0
+        try:
+            await asyncio.to_thread(insert_batch, batch)
+            await asyncio.to_thread(self._delete_rows, ids)
+            with self._lock:
+                self._attempted.difference_update(ids)
+                for entry in batch:
+                    entries = self._pending.get(entry["user_id"])
+                    if entries is not None:
+                        entries.pop(entry["id"], None)
+                        if not entries:
+                            del self._pending[entry["user_id"]]
+        finally:
+            with self._lock:
+                self._in_flight.difference_update(ids)
+            if self._batch_done is not None:
+                self._batch_done.set()
+                self._batch_done = asyncio.Event()
+        self.flushed += len(batch)
+        return len(batch)
+
+    def _delete_rows(self, ids: List[str]):
+        with self._lock:
+            self._db.executemany("DELETE FROM pending_entries WHERE id = ?", [(entry_id,) for entry_id in ids])
+
+    async def _flush_loop(self, insert_batch):
+        failures = 0
+        while True:
+            try:
+                if await self.flush_once(insert_batch) >= self.batch_size:
+                    # More waiting behind this batch: keep draining
+                    failures = 0
+                    continue
+                failures = 0
+                delay = self.flush_interval
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                self.failed_flushes += 1
+                self.last_error = str(e)
+                delay = min(self.max_backoff, self.flush_interval * 2 ** failures) * random.uniform(0.5, 1.0)
+                logger.warning("Entry journal flush failed (attempt %d, %d pending), retrying in %.1fs: %s",
+                               failures, self.pending_count(), delay, e)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "pending": self.pending_count(),
+            "in_flight": len(self._in_flight),
+            "flushed": self.flushed,
+            "failed_flushes": self.failed_flushes,
+            "last_error": self.last_error
+        }
+
+# Global instance
+entry_journal = EntryJournal(
+    path=os.getenv('ENTRY_JOURNAL_PATH', str(Path(__file__).parent / 'entry_journal.sqlite3')),
+    enabled=os.getenv('FOOD_ENTRY_WRITE_BEHIND', 'false').lower() == 'true',
+    batch_size=int(os.getenv('ENTRY_JOURNAL_BATCH_SIZE', '50')),
+    flush_interval_seconds=float(os.getenv('ENTRY_JOURNAL_FLUSH_SECONDS', '1'))
+)
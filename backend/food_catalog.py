@@ -0,0 +1,171 @@
+"""
+Food Catalog
+Local food catalog: a seed list of common foods plus foods learned from Passio results, searchable offline
+"""
+
+import os
+import logging
+from collections import OrderedDict
+from typing import List, Dict, Any
+
+from passio_service import stable_food_id
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# name, category, carbs, fat, protein, sugar (grams per 100g)
+SEED_FOODS = [
+    ("Apple", "Fruits", 14.0, 0.2, 0.3, 10.4),
+    ("Banana", "Fruits", 23.0, 0.3, 1.1, 12.2),
+    ("Orange", "Fruits", 12.0, 0.1, 0.9, 9.4),
+    ("Grapes", "Fruits", 18.0, 0.2, 0.7, 16.0),
+    ("Strawberries", "Fruits", 7.7, 0.3, 0.7, 4.9),
+    ("Blueberries", "Fruits", 14.5, 0.3, 0.7, 10.0),
+    ("Mango", "Fruits", 15.0, 0.4, 0.8, 13.7),
+    ("Pineapple", "Fruits", 13.1, 0.1, 0.5, 9.9),
+    ("Watermelon", "Fruits", 7.6, 0.2, 0.6, 6.2),
+    ("Pear", "Fruits", 15.2, 0.1, 0.4, 9.8),
+    ("Avocado", "Fruits", 8.5, 14.7, 2.0, 0.7),
+    ("Raisins", "Fruits", 79.2, 0.5, 3.1, 59.2),
+    ("Chicken Breast", "Protein", 0.0, 3.6, 31.0, 0.0),
+    ("Salmon", "Protein", 0.0, 13.4, 20.4, 0.0),
+    ("Tuna", "Protein", 0.0, 1.0, 29.0, 0.0),
+    ("Beef Steak", "Protein", 0.0, 15.0, 26.0, 0.0),
+    ("Ground Beef", "Protein", 0.0, 20.0, 17.0, 0.0),
+    ("Pork Chop", "Protein", 0.0, 14.0, 27.0, 0.0),
+    ("Bacon", "Protein", 1.4, 42.0, 37.0, 0.0),
+    ("Egg", "Protein", 1.1, 10.6, 12.6, 1.1),
+    ("Tofu", "Protein", 1.9, 4.8, 8.1, 0.6),
+    ("Shrimp", "Protein", 0.2, 1.7, 24.0, 0.0),
+    ("Lentils", "Protein", 20.1, 0.4, 9.0, 1.8),
+    ("Chickpeas", "Protein", 27.4, 2.6, 8.9, 4.8),
+    ("White Rice", "Grains", 28.0, 0.3, 2.7, 0.1),
+    ("Brown Rice", "Grains", 23.0, 0.9, 2.6, 0.4),
+    ("Pasta", "Grains", 31.0, 0.9, 5.8, 0.6),
+    ("Whole Wheat Bread", "Grains", 43.0, 3.4, 13.0, 2.5),
+    ("White Bread", "Grains", 49.0, 3.3, 9.0, 5.0),
+    ("Oatmeal", "Grains", 12.0, 1.4, 2.5, 0.5),
+    ("Quinoa", "Grains", 21.3, 1.9, 4.4, 0.9),
+    ("Bagel", "Grains", 53.0, 1.6, 10.0, 6.1),
+    ("Corn Flakes", "Grains", 84.0, 0.9, 7.5, 9.5),
+    ("Granola", "Grains", 64.0, 20.0, 10.0, 24.0),
+    ("Tortilla", "Grains", 50.0, 7.0, 8.0, 2.0),
+    ("Potato", "Vegetables", 17.0, 0.1, 2.0, 0.8),
+    ("Sweet Potato", "Vegetables", 20.0, 0.1, 1.6, 4.2),
+    ("Broccoli", "Vegetables", 7.0, 0.4, 2.8, 1.7),
+    ("Carrot", "Vegetables", 9.6, 0.2, 0.9, 4.7),
+    ("Spinach", "Vegetables", 3.6, 0.4, 2.9, 0.4),
+    ("Tomato", "Vegetables", 3.9, 0.2, 0.9, 2.6),
+    ("Cucumber", "Vegetables", 3.6, 0.1, 0.7, 1.7),
+    ("Lettuce", "Vegetables", 2.9, 0.2, 1.4, 0.8),
+    ("Green Peas", "Vegetables", 14.5, 0.4, 5.4, 5.7),
+    ("Sweet Corn", "Vegetables", 19.0, 1.4, 3.3, 6.3),
+    ("Whole Milk", "Dairy", 4.8, 3.3, 3.2, 5.1),
+    ("Skim Milk", "Dairy", 5.0, 0.1, 3.4, 5.0),
+    ("Greek Yogurt", "Dairy", 3.6, 5.0, 9.0, 3.2),
+    ("Fruit Yogurt", "Dairy", 19.0, 1.4, 4.0, 19.0),
+    ("Cheddar Cheese", "Dairy", 1.3, 33.0, 25.0, 0.5),
+    ("Butter", "Dairy", 0.1, 81.0, 0.9, 0.1),
+    ("Olive Oil", "Oils", 0.0, 100.0, 0.0, 0.0),
+    ("Ice Cream", "Desserts", 24.0, 11.0, 3.5, 21.0),
+    ("Milk Chocolate", "Desserts", 59.0, 30.0, 7.7, 52.0),
+    ("Dark Chocolate", "Desserts", 46.0, 43.0, 7.8, 24.0),
+    ("Chocolate Chip Cookie", "Desserts", 65.0, 23.0, 5.0, 35.0),
+    ("Glazed Donut", "Desserts", 51.0, 23.0, 5.0, 23.0),
+    ("Chocolate Cake", "Desserts", 51.0, 16.0, 5.0, 36.0),
+    ("Gummy Candy", "Desserts", 77.0, 0.2, 6.9, 46.0),
+    ("Honey", "Desserts", 82.0, 0.0, 0.3, 82.0),
+    ("Cola", "Beverages", 10.6, 0.0, 0.0, 10.6),
+    ("Orange Juice", "Beverages", 10.4, 0.2, 0.7, 8.4),
+    ("Apple Juice", "Beverages", 11.3, 0.1, 0.1, 9.6),
+    ("Beer", "Beverages", 3.6, 0.0, 0.5, 0.0),
+    ("Red Wine", "Beverages", 2.6, 0.0, 0.1, 0.6),
+    ("Water", "Beverages", 0.0, 0.0, 0.0, 0.0),
+    ("Black Coffee", "Beverages", 0.0, 0.0, 0.1, 0.0),
+    ("Tea", "Beverages", 0.2, 0.0, 0.0, 0.0),
+    ("Almonds", "Nuts", 22.0, 49.0, 21.0, 4.4),
+    ("Peanut Butter", "Nuts", 20.0, 50.0, 25.0, 9.2),
+    ("Walnuts", "Nuts", 14.0, 65.0, 15.0, 2.6),
+    ("Potato Chips", "Snacks", 53.0, 34.0, 6.6, 0.3),
+    ("Popcorn", "Snacks", 78.0, 4.5, 13.0, 0.9),
+    ("Pretzels", "Snacks", 80.0, 2.6, 10.0, 2.8),
+    ("Pizza", "Meals", 33.0, 10.0, 11.0, 3.6),
+    ("Hamburger", "Meals", 30.0, 12.0, 13.0, 5.0),
+    ("French Fries", "Meals", 41.0, 15.0, 3.4, 0.3),
+    ("Caesar Salad", "Meals", 6.0, 12.0, 5.0, 2.0),
+    ("Sushi Roll", "Meals", 29.0, 3.0, 5.0, 6.0),
+    ("Chicken Curry", "Meals", 7.0, 8.0, 12.0, 2.5),
+    ("Spaghetti Bolognese", "Meals", 18.0, 5.0, 8.0, 3.0),
+]
+
+def _name_key(name: str) -> str:
+    return " ".join(name.lower().split())
+
+def match_quality(name: str, query: str) -> float:
+    """
+    How well a food name matches a query: exact > prefix > word prefix > substring (0 for no match)
+    """
+    name_key = _name_key(name)
+    query_key = _name_key(query)
+    if not query_key:
+        return 0.0
+    if name_key == query_key:
+        return 1.0
+    if name_key.startswith(query_key):
+        return 0.8
+    if any(word.startswith(query_key) for word in name_key.split()):
+        return 0.6
+    if query_key in name_key:
+        return 0.4
+    return 0.0
+
+class FoodCatalog:
+    def __init__(self, max_learned: int = 5000):
+        self.max_learned = max_learned
+        self._seed: Dict[str, Dict[str, Any]] = {}
+        # Foods seen in Passio results, most recently seen last
+        self._learned: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        for name, category, carbs, fat, protein, sugar in SEED_FOODS:
+            self._seed[_name_key(name)] = {
+                "id": stable_food_id(name, source="food"),
+                "name": name,
+                "brand": None,
+                "carbs_per_100g": carbs,
+                "fat_per_100g": fat,
+                "protein_per_100g": protein,
+                "sugar_per_100g": sugar,
+                "category": category,
+                "confidence": 0.7
+            }
+
+    def learn(self, items: List[Dict[str, Any]]):
+        """
+        Remember foods from upstream results so later searches can answer offline
+        """
+        for item in items:
+            name = item.get("name")
+            if not name or str(item.get("id", "")).startswith("fallback_"):
+                continue
+            key = _name_key(name) + "|" + _name_key(item.get("brand") or "")
+            self._learned[key] = item
+            self._learned.move_to_end(key)
+        while len(self._learned) > self.max_learned:
+            self._learned.popitem(last=False)
+
+    def foods(self) -> List[Dict[str, Any]]:
+        return list(self._seed.values()) + list(self._learned.values())
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        matches = []
+        for item in self.foods():
+            quality = match_quality(item["name"], query)
+            if quality > 0:
+                matches.append((quality, item))
+        matches.sort(key=lambda match: match[0], reverse=True)
+        return [item for _, item in matches[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"seed_foods": len(self._seed), "learned_foods": len(self._learned)}
+
+# Global instance
+food_catalog = FoodCatalog(max_learned=int(os.getenv('FOOD_CATALOG_MAX_LEARNED', '5000')))
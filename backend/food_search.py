@@ -0,0 +1,86 @@
+"""
+Federated Food Search
+Queries several food sources concurrently under one deadline and merges what arrived into one ranked list
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, List, Dict, Optional, Tuple, Any
+
+from food_catalog import match_quality
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Trust in each source when the same query matches equally well
+SOURCE_WEIGHTS = {"recent": 3.0, "passio": 1.0, "catalog": 0.8}
+# Upstream search also returns fuzzy/semantic matches whose names don't contain the query
+UPSTREAM_MATCH_FLOOR = 0.3
+
+def _dedupe_key(item: Dict[str, Any]) -> str:
+    return " ".join(str(item.get("name", "")).lower().split()) + "|" + str(item.get("brand") or "").lower()
+
+def _consume_late_result(task: asyncio.Task):
+    # Sources that miss the deadline keep running (their side effects, e.g. catalog learning, still
+    # matter); retrieve the outcome so a late failure isn't reported as never retrieved
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug("Late search source failed: %s", task.exception())
+
+def rank_results(query: str, results_by_source: Dict[str, List[Dict[str, Any]]], limit: int) -> List[Dict[str, Any]]:
+    """
+    Merge results from several sources: duplicates (same name and brand) collapse into the best-scoring
+    record, and every result lists the sources that returned it
+    """
+    merged: Dict[str, list] = {}
+    for source, items in results_by_source.items():
+        weight = SOURCE_WEIGHTS.get(source, 1.0)
+        for position, item in enumerate(items):
+            quality = match_quality(item.get("name", ""), query)
+            if quality == 0.0:
+                if source != "passio":
+                    continue
+                quality = UPSTREAM_MATCH_FLOOR
+            confidence = item.get("confidence") or 1.0
+            # Keep each source's own ordering as a tie-breaker
+            score = weight * quality * confidence / (1 + 0.05 * position)
+            key = _dedupe_key(item)
+            existing = merged.get(key)
+            if existing is None:
+                merged[key] = [score, item, [source]]
+                continue
+            existing[2].append(source)
+            if score > existing[0]:
+                existing[0], existing[1] = score, item
+    ranked = sorted(merged.values(), key=lambda entry: entry[0], reverse=True)
+    return [{**item, "sources": sources} for _, item, sources in ranked[:limit]]
+
+async def federated_search(query: str, limit: int, sources: Dict[str, Awaitable[Optional[List[Dict[str, Any]]]]],
+                           deadline_seconds: float) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """
+    Run every source concurrently and rank whatever finished within the deadline
+    Returns (results, per-source status); a source returning None counts as unavailable
+    """
+    tasks = {name: asyncio.ensure_future(source) for name, source in sources.items()}
+    try:
+        done, _ = await asyncio.wait(tasks.values(), timeout=deadline_seconds)
+    except asyncio.CancelledError:
+        # The search itself was abandoned (e.g. a superseded typeahead lookup): stop its upstream calls too
+        for task in tasks.values():
+            task.cancel()
+        raise
+
+    results_by_source: Dict[str, List[Dict[str, Any]]] = {}
+    status: Dict[str, Dict[str, Any]] = {}
+    for name, task in tasks.items():
+        if task not in done:
+            task.add_done_callback(_consume_late_result)
+            status[name] = {"status": "timeout"}
+        elif task.exception() is not None:
+            logger.warning("Search source %s failed: %s", name, task.exception())
+            status[name] = {"status": "error"}
+        elif task.result() is None:
+            status[name] = {"status": "unavailable"}
+        else:
+            results_by_source[name] = task.result()
+            status[name] = {"status": "ok", "count": len(task.result())}
+    return rank_results(query, results_by_source, limit), status
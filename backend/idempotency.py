@@ -0,0 +1,118 @@
+"""
+Idempotency Keys
+Bounded TTL store that replays a write endpoint's response when a client retries with the same Idempotency-Key
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Any
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+
+class IdempotencyConflict(ValueError):
+    pass
+
+def request_fingerprint(payload: Any) -> str:
+    """
+    Stable digest of a request body, so a reused key with a different body can be rejected
+    """
+    encoded = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+class _Record:
+    __slots__ = ("fingerprint", "future", "expires_at")
+
+    def __init__(self, fingerprint: str, future: asyncio.Future, expires_at: float):
+        self.fingerprint = fingerprint
+        self.future = future
+        self.expires_at = expires_at
+
+class IdempotencyStore:
+    def __init__(self, ttl_seconds: float = 86400.0, max_entries: int = 10000):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        # (scope, user_id, key) -> record; the future resolves once the first request finishes
+        self._records: "OrderedDict[Tuple[str, str, str], _Record]" = OrderedDict()
+        self.executions = 0
+        self.replays = 0
+        self.conflicts = 0
+
+    async def run(self, scope: str, user_id: str, key: Optional[str], fingerprint: str,
+                  handler: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run handler once per (scope, user, key) and return (result, replayed)
+        Concurrent duplicates wait for the in-flight request and share its result; failures are
+        not stored, so a retry after an error runs the handler again
+        """
+        if not key:
+            return await handler(), False
+        if len(key) > MAX_KEY_LENGTH:
+            raise ValueError(f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+
+        self._expire()
+        store_key = (scope, user_id, key)
+        record = self._records.get(store_key)
+        if record is not None:
+            if record.fingerprint != fingerprint:
+                self.conflicts += 1
+                raise IdempotencyConflict("Idempotency-Key was already used with a different request")
+            self.replays += 1
+            logger.debug("Replaying %s response for idempotency key %s", scope, key)
+            return await asyncio.shield(record.future), True
+
+        record = _Record(fingerprint, asyncio.get_running_loop().create_future(), time.monotonic() + self.ttl)
+        self._records[store_key] = record
+        while len(self._records) > self.max_entries:
+            self._records.popitem(last=False)
+
+        self.executions += 1
+        try:
+            result = await handler()
+        except BaseException as e:
+            if self._records.get(store_key) is record:
+                del self._records[store_key]
+            if isinstance(e, asyncio.CancelledError):
+                record.future.cancel()
+            else:
+                record.future.set_exception(e)
+                # Waiters re-raise it; mark it retrieved so an unwaited failure isn't logged by asyncio
+                record.future.exception()
+            raise
+
+        record.future.set_result(result)
+        # The replay window starts when the response is known
+        record.expires_at = time.monotonic() + self.ttl
+        return result, False
+
+    def _expire(self):
+        # Records are kept in creation order, so expired ones collect at the front
+        now = time.monotonic()
+        while self._records:
+            record = next(iter(self._records.values()))
+            if not record.future.done() or record.expires_at > now:
+                break
+            self._records.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "keys": len(self._records),
+            "in_flight": sum(1 for record in self._records.values() if not record.future.done()),
+            "executions": self.executions,
+            "replays": self.replays,
+            "conflicts": self.conflicts,
+            "ttl_seconds": self.ttl
+        }
+
+# Global instance
+idempotency_store = IdempotencyStore(
+    ttl_seconds=float(os.getenv('IDEMPOTENCY_TTL_SECONDS', '86400')),
+    max_entries=int(os.getenv('IDEMPOTENCY_MAX_KEYS', '10000'))
+)
@@ -0,0 +1,174 @@
+"""
+Image Preprocessing Pipeline
+Validates, orients, strips and downsizes food photos before they are sent to Passio recognition
+"""
+
+import io
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, Optional, Any
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# MPO is the multi-picture JPEG variant many phone cameras produce
+ALLOWED_FORMATS = {"JPEG", "MPO", "PNG", "WEBP"}
+
+class ImageValidationError(ValueError):
+    pass
+
+def dhash(image: Image.Image, hash_size: int = 8) -> int:
+    """
+    Difference hash: compares adjacent pixel brightness on a tiny grayscale thumbnail
+    Robust to re-compression, small crops and exposure changes
+    """
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+class PreparedImage:
+    def __init__(self, data: bytes, content_type: str, filename: str, width: int, height: int,
+                 original_bytes: int, fingerprint: Optional[int] = None):
+        self.data = data
+        self.content_type = content_type
+        self.filename = filename
+        self.width = width
+        self.height = height
+        self.original_bytes = original_bytes
+        # Perceptual hash of the processed image, used to spot near-duplicate photos
+        self.fingerprint = fingerprint
+
+class ImagePipeline:
+    def __init__(self, max_dimension: int = 1024, jpeg_quality: int = 82,
+                 max_input_bytes: int = 15 * 1024 * 1024, max_pixels: int = 50_000_000, enabled: bool = True):
+        self.max_dimension = max_dimension
+        self.jpeg_quality = jpeg_quality
+        self.max_input_bytes = max_input_bytes
+        self.max_pixels = max_pixels
+        self.enabled = enabled
+        self.stats = {
+            "processed": 0,
+            "rejected": 0,
+            "bytes_in": 0,
+            "bytes_out": 0,
+            "preprocess_ms": 0.0,
+            # Upload timings are split by mode so the effect of preprocessing can be compared
+            "uploads": {
+                "preprocessed": {"count": 0, "bytes": 0, "duration_ms": 0.0},
+                "raw": {"count": 0, "bytes": 0, "duration_ms": 0.0}
+            }
+        }
+
+    def prepare(self, image_data: bytes) -> PreparedImage:
+        """
+        CPU-bound: call through prepare_async from request handlers
+        """
+        if not self.enabled:
+            return PreparedImage(image_data, "image/jpeg", "food.jpg", 0, 0, len(image_data))
+
+        start = time.perf_counter()
+        try:
+            prepared = self._process(image_data)
+        except ImageValidationError:
+            self.stats["rejected"] += 1
+            raise
+
+        self.stats["processed"] += 1
+        self.stats["bytes_in"] += prepared.original_bytes
+        self.stats["bytes_out"] += len(prepared.data)
+        self.stats["preprocess_ms"] += (time.perf_counter() - start) * 1000
+        return prepared
+
+    async def prepare_async(self, image_data: bytes) -> PreparedImage:
+        return await asyncio.to_thread(self.prepare, image_data)
+
+    def _process(self, image_data: bytes) -> PreparedImage:
+        if not image_data:
+            raise ImageValidationError("Image is empty")
+        if len(image_data) > self.max_input_bytes:
+            raise ImageValidationError(f"Image exceeds {self.max_input_bytes // (1024 * 1024)} MB limit")
+
+        try:
+            image = Image.open(io.BytesIO(image_data))
+        except UnidentifiedImageError:
+            raise ImageValidationError("Unsupported or corrupt image")
+
+        if image.format not in ALLOWED_FORMATS:
+            raise ImageValidationError(f"Unsupported image format: {image.format}")
+        if image.width * image.height > self.max_pixels:
+            raise ImageValidationError("Image resolution is too large")
+
+        # Let the JPEG decoder downscale by a power of two while decoding, much cheaper than a full decode
+        if image.format in ("JPEG", "MPO"):
+            image.draft("RGB", (self.max_dimension, self.max_dimension))
+
+        try:
+            image = ImageOps.exif_transpose(image)
+            image = self._to_rgb(image)
+            image.thumbnail((self.max_dimension, self.max_dimension), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        except (OSError, ValueError) as e:
+            raise ImageValidationError(f"Could not decode image: {e}")
+
+        # Re-encoding without passing exif/icc drops all metadata (GPS, device info, thumbnails)
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=self.jpeg_quality, optimize=True)
+        return PreparedImage(
+            output.getvalue(), "image/jpeg", "food.jpg", image.width, image.height, len(image_data),
+            fingerprint=dhash(image)
+        )
+
+    def _to_rgb(self, image: Image.Image) -> Image.Image:
+        if image.mode == "RGB":
+            return image
+        if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            return background
+        return image.convert("RGB")
+
+    def record_upload(self, prepared: PreparedImage, duration_ms: float):
+        """
+        Record how long the upstream recognition upload took for an image
+        """
+        bucket = self.stats["uploads"]["preprocessed" if self.enabled else "raw"]
+        bucket["count"] += 1
+        bucket["bytes"] += len(prepared.data)
+        bucket["duration_ms"] += duration_ms
+
+    def summary(self) -> Dict[str, Any]:
+        stats = self.stats
+        processed = stats["processed"]
+        uploads = {}
+        for mode, bucket in stats["uploads"].items():
+            uploads[mode] = {
+                **bucket,
+                "avg_bytes": round(bucket["bytes"] / bucket["count"]) if bucket["count"] else None,
+                "avg_duration_ms": round(bucket["duration_ms"] / bucket["count"], 1) if bucket["count"] else None
+            }
+        return {
+            "enabled": self.enabled,
+            "processed": processed,
+            "rejected": stats["rejected"],
+            "bytes_in": stats["bytes_in"],
+            "bytes_out": stats["bytes_out"],
+            "bytes_saved": stats["bytes_in"] - stats["bytes_out"],
+            "avg_preprocess_ms": round(stats["preprocess_ms"] / processed, 1) if processed else None,
+            "uploads": uploads
+        }
+
+# Global instance
+image_pipeline = ImagePipeline(
+    max_dimension=int(os.getenv('IMAGE_MAX_DIMENSION', '1024')),
+    jpeg_quality=int(os.getenv('IMAGE_JPEG_QUALITY', '82')),
+    enabled=os.getenv('IMAGE_PREPROCESSING_ENABLED', 'true').lower() == 'true'
+)
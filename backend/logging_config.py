@@ -0,0 +1,179 @@
+"""
+Logging Configuration
+Queue-based, non-blocking JSON logging with request IDs, payload size caps and per-logger sampling
+"""
+
+import os
+import sys
+import copy
+import json
+import queue
+import random
+import atexit
+import logging
+import logging.handlers
+import contextvars
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+MAX_LOG_MESSAGE_CHARS = int(os.getenv('LOG_MAX_MESSAGE_CHARS', '2000'))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# Record attributes that are part of every LogRecord (anything else came in via `extra=`)
+_STANDARD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+def truncate_for_log(value, limit: int = 500) -> str:
+    """
+    Cap a payload (e.g. an upstream response body) before it is logged
+    """
+    text = str(value)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [truncated {len(text) - limit} chars]"
+
+class RequestContextFilter(logging.Filter):
+    """
+    Stamp records with the ID of the request being served
+    """
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id_var.get()
+        return True
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of records per logger, e.g. {"passio_service": 0.1}
+    Rates apply to the named logger and its children; CRITICAL records are always kept
+    """
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._resolved: Dict[str, float] = {}
+
+    def _rate_for(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            candidate = name
+            while candidate:
+                if candidate in self.rates:
+                    rate = self.rates[candidate]
+                    break
+                candidate = candidate.rpartition(".")[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.CRITICAL:
+            return True
+        rate = self._rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": truncate_for_log(record.getMessage(), MAX_LOG_MESSAGE_CHARS),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = truncate_for_log(record.exc_text, MAX_LOG_MESSAGE_CHARS)
+        return json.dumps(entry, default=str)
+
+# Renders tracebacks on the logging thread before records are queued
+_exception_formatter = logging.Formatter()
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks the caller: when the queue is full the record is dropped and counted
+    """
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args and render the traceback on the calling thread (they may not be safe to touch later),
+        # capping size so a huge payload can't pin memory in the queue. Unlike QueueHandler.prepare, the
+        # traceback stays in exc_text rather than being folded into msg, so formatters still see it apart
+        message = truncate_for_log(record.getMessage(), MAX_LOG_MESSAGE_CHARS)
+        record = copy.copy(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+        record.message = message
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def _parse_sample_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for part in spec.split(","):
+        if "=" not in part:
+            continue
+        name, _, rate = part.partition("=")
+        try:
+            rates[name.strip()] = max(0.0, min(1.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+
+def configure_logging(level: int = logging.INFO):
+    """
+    Route all logging through a bounded queue drained by a background listener thread
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    if os.getenv('LOG_FORMAT', 'json').lower() == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s')
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _queue_handler.addFilter(SamplingFilter(_parse_sample_rates(os.getenv('LOG_SAMPLE_RATES', ''))))
+    _queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """
+    Flush queued records and stop the listener thread
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler is not None else 0
@@ -0,0 +1,158 @@
+"""
+Event Loop Lag Monitor
+Samples asyncio scheduling delay continuously and captures the stack of any call that stalls the loop
+"""
+
+import asyncio
+import os
+import sys
+import time
+import threading
+import traceback
+import logging
+from collections import deque
+from typing import List, Dict, Optional, Any
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in milliseconds (last bucket is +Inf)
+LAG_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+class LoopLagMonitor:
+    def __init__(self, interval_ms: float = 100.0, stall_threshold_ms: float = 200.0, max_stalls: int = 20):
+        self.interval = interval_ms / 1000
+        self.stall_threshold = stall_threshold_ms / 1000
+        self.bucket_counts = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.sample_count = 0
+        self.lag_sum_ms = 0.0
+        self.lag_max_ms = 0.0
+        self.stall_count = 0
+        self.recent_stalls: deque = deque(maxlen=max_stalls)
+
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = time.monotonic()
+        self._stall_reported = False
+
+    def start(self):
+        """
+        Start sampling on the running event loop, plus a watchdog thread that
+        grabs the loop thread's stack while it is blocked
+        """
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._sample_loop())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(
+            "Event loop lag monitor started (interval=%.0fms, stall threshold=%.0fms)",
+            self.interval * 1000, self.stall_threshold * 1000
+        )
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _sample_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, loop.time() - expected) * 1000
+            self._record(lag_ms)
+            self._heartbeat = time.monotonic()
+            self._stall_reported = False
+
+    def _record(self, lag_ms: float):
+        index = len(LAG_BUCKETS_MS)
+        for i, bound in enumerate(LAG_BUCKETS_MS):
+            if lag_ms <= bound:
+                index = i
+                break
+        self.bucket_counts[index] += 1
+        self.sample_count += 1
+        self.lag_sum_ms += lag_ms
+        self.lag_max_ms = max(self.lag_max_ms, lag_ms)
+
+    def _watch(self):
+        """
+        Runs in a separate thread: when the sampler misses its heartbeat by more than
+        the stall threshold, the loop thread is stuck in a blocking call right now
+        """
+        check_every = max(self.stall_threshold / 4, 0.01)
+        while not self._stopped.wait(check_every):
+            blocked_for = time.monotonic() - self._heartbeat - self.interval
+            if blocked_for < self.stall_threshold or self._stall_reported:
+                continue
+            self._stall_reported = True
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame))
+            self.stall_count += 1
+            self.recent_stalls.append({
+                "detected_at": time.time(),
+                "blocked_ms": round(blocked_for * 1000, 1),
+                "stack": stack
+            })
+            logger.warning(
+                "Event loop blocked for %.0fms, current stack:\n%s", blocked_for * 1000, stack
+            )
+
+    def histogram(self) -> List[Dict[str, Any]]:
+        bounds = [str(bound) for bound in LAG_BUCKETS_MS] + ["+Inf"]
+        return [{"le_ms": bound, "count": count} for bound, count in zip(bounds, self.bucket_counts)]
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """
+        Approximate percentile from the histogram (returns the bucket upper bound)
+        """
+        if self.sample_count == 0:
+            return None
+        target = fraction * self.sample_count
+        running = 0
+        for i, count in enumerate(self.bucket_counts):
+            running += count
+            if running >= target:
+                return float(LAG_BUCKETS_MS[i]) if i < len(LAG_BUCKETS_MS) else self.lag_max_ms
+        return self.lag_max_ms
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Compact view for health checks
+        """
+        return {
+            "running": self._task is not None,
+            "samples": self.sample_count,
+            "mean_lag_ms": round(self.lag_sum_ms / self.sample_count, 2) if self.sample_count else 0.0,
+            "p99_lag_ms": self.percentile(0.99),
+            "max_lag_ms": round(self.lag_max_ms, 2),
+            "stalls": self.stall_count
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.summary(),
+            "interval_ms": self.interval * 1000,
+            "stall_threshold_ms": self.stall_threshold * 1000,
+            "histogram": self.histogram(),
+            "recent_stalls": list(self.recent_stalls)
+        }
+
+# Global instance
+loop_monitor = LoopLagMonitor(
+    interval_ms=float(os.getenv('LOOP_LAG_INTERVAL_MS', '100')),
+    stall_threshold_ms=float(os.getenv('LOOP_STALL_THRESHOLD_MS', '200'))
+)
@@ -0,0 +1,123 @@
+"""
+Nutrient Estimator
+Estimates carbs, fat, protein and sugar for foods Passio returned without them, from the nearest
+catalog foods by name (hashed character n-grams, one matrix product per batch)
+"""
+
+import zlib
+import logging
+from typing import List, Dict, Optional, Tuple, Any
+
+import numpy as np
+
+from query_normalizer import canonicalize_query
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+NUTRIENT_FIELDS = ("carbs_per_100g", "fat_per_100g", "protein_per_100g", "sugar_per_100g")
+# Generic values for a name too unlike every catalog food to borrow from one (the old keyword defaults)
+DEFAULT_NUTRIENTS = (10.0, 5.0, 5.0, 5.0)
+
+class NutrientEstimator:
+    def __init__(self, dimensions: int = 2048, ngram_sizes: Tuple[int, ...] = (2, 3, 4), neighbors: int = 3,
+                 temperature: float = 0.1, similarity_floor: float = 0.3, confident_similarity: float = 0.75):
+        self.dimensions = dimensions
+        self.ngram_sizes = ngram_sizes
+        self.neighbors = neighbors
+        # Neighbors are weighted by exp((similarity - best) / temperature): lower keeps closer to the nearest food
+        self.temperature = temperature
+        # Below this cosine similarity to the nearest catalog food, DEFAULT_NUTRIENTS are used instead
+        self.similarity_floor = similarity_floor
+        # High confidence needs this similarity and every word of the nearest food's name in the query
+        # (character n-grams alone put "water" next to "watermelon")
+        self.confident_similarity = confident_similarity
+        self._names: List[str] = []
+        self._name_words: List[set] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._nutrients: Optional[np.ndarray] = None
+        self._prior = np.array(DEFAULT_NUTRIENTS, dtype=np.float32)
+        self.batches = 0
+        self.estimated = 0
+        self.low_confidence = 0
+
+    def _embed(self, canonical_names: List[str]) -> np.ndarray:
+        """
+        One L2-normalized row per canonical name; an empty name stays an all-zero row
+        """
+        rows, columns = [], []
+        for row, canonical in enumerate(canonical_names):
+            if not canonical:
+                continue
+            text = f" {canonical} "
+            for size in self.ngram_sizes:
+                for start in range(len(text) - size + 1):
+                    rows.append(row)
+                    # crc32 rather than hash(): the catalog matrix must not depend on the process's hash seed
+                    columns.append(zlib.crc32(text[start:start + size].encode()) % self.dimensions)
+        matrix = np.zeros((len(canonical_names), self.dimensions), dtype=np.float32)
+        np.add.at(matrix, (rows, columns), 1.0)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def _ensure_catalog(self):
+        if self._matrix is not None:
+            return
+        # Imported here: food_catalog imports passio_service, which imports this module
+        from food_catalog import SEED_FOODS
+        # Seed foods only: learned foods may themselves carry estimated nutrients
+        self._names = [name for name, *_ in SEED_FOODS]
+        # Canonical form on both sides, so "Red Apples" lands on "apple"
+        canonical_names = [canonicalize_query(name) for name in self._names]
+        self._name_words = [set(canonical.split()) for canonical in canonical_names]
+        self._nutrients = np.array([values for _, _, *values in SEED_FOODS], dtype=np.float32)
+        self._matrix = self._embed(canonical_names)
+
+    def estimate_many(self, names: List[str]) -> List[Dict[str, Any]]:
+        """
+        Estimates for a batch of food names, in order; each has the four nutrient fields (grams per 100g),
+        "confidence" ("high" or "low") and "nearest", the closest catalog food
+        """
+        if not names:
+            return []
+        self._ensure_catalog()
+        canonical_names = [canonicalize_query(name) for name in names]
+        similarities = self._embed(canonical_names) @ self._matrix.T
+        k = min(self.neighbors, len(self._names))
+        nearest = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        nearest_similarities = np.take_along_axis(similarities, nearest, axis=1)
+        best = nearest_similarities.argmax(axis=1)
+        best_similarities = nearest_similarities[np.arange(len(names)), best]
+        best_names = nearest[np.arange(len(names)), best]
+        # A close match outweighs several loose ones ("coca cola" is cola, not part chocolate cake)
+        weights = np.exp((nearest_similarities - best_similarities[:, None]) / self.temperature) * (nearest_similarities > 0)
+        totals = weights.sum(axis=1, keepdims=True)
+        weighted = np.einsum("qk,qkn->qn", weights, self._nutrients[nearest]) / np.maximum(totals, 1e-12)
+        matched = best_similarities >= self.similarity_floor
+        estimates = np.where(matched[:, None], weighted, self._prior)
+
+        self.batches += 1
+        self.estimated += len(names)
+        results = []
+        for canonical, values, similarity, is_matched, catalog_index in zip(
+                canonical_names, estimates.tolist(), best_similarities.tolist(), matched.tolist(), best_names.tolist()):
+            confident = (similarity >= self.confident_similarity
+                         and self._name_words[catalog_index] <= set(canonical.split()))
+            if not confident:
+                self.low_confidence += 1
+            result = {field: round(value, 1) for field, value in zip(NUTRIENT_FIELDS, values)}
+            result["confidence"] = "high" if confident else "low"
+            result["nearest"] = self._names[catalog_index] if is_matched else None
+            results.append(result)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "catalog_foods": len(self._names),
+            "batches": self.batches,
+            "estimated": self.estimated,
+            "low_confidence_ratio": round(self.low_confidence / self.estimated, 3) if self.estimated else None
+        }
+
+# Global instance
+nutrient_estimator = NutrientEstimator()
@@ -5,13 +5,37 @@ Integrates with Passio API for real food data and nutrition information
 
 import httpx
 import os
+import asyncio
+import hashlib
+import contextvars
 import logging
 from typing import List, Dict, Optional, Any
 from datetime import datetime
 
+from request_metrics import track_call
+from tracing import tracer, traced, SPAN_KIND_CLIENT
+from logging_config import truncate_for_log
+from shared_cache import shared_cache, TieredCache
+from query_normalizer import canonicalize_query, query_key_stats
+from nutrient_estimator import nutrient_estimator
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Prefixes of IDs minted locally; Passio has no record of these
+SYNTHETIC_ID_PREFIXES = ("food_", "fallback_", "recent_", "pop_")
+
+def stable_food_id(name: str, brand: Optional[str] = None, source: str = "food") -> str:
+    """
+    Deterministic ID for a food without a Passio ID: the same source, brand and name give the same ID
+    in every worker and across restarts (unlike hash(), which is salted per process)
+    """
+    key = "|".join(" ".join(str(part or "").lower().split()) for part in (source, brand, name))
+    return f"{source}_{hashlib.sha1(key.encode()).hexdigest()[:16]}"
+
+def is_synthetic_food_id(food_id: str) -> bool:
+    return food_id.startswith(SYNTHETIC_ID_PREFIXES)
+
 class PassioService:
     def __init__(self):
         self.api_key = os.getenv('PASSIO_API_KEY')
@@ -20,111 +44,226 @@ class PassioService:
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
-        
-    async def search_food(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
-        """
-        Search for food items using Passio API
+        # Food details rarely change; cache them (per worker, then host-wide) to avoid repeat lookups
+        self.details_cache = TieredCache(
+            "passio.details",
+            maxsize=int(os.getenv('PASSIO_DETAILS_CACHE_SIZE', '2000')),
+            ttl_seconds=float(os.getenv('PASSIO_DETAILS_CACHE_TTL', '3600')),
+            shared=shared_cache
+        )
+        # canonical query + limit -> normalized search results
+        self.search_cache = TieredCache(
+            "passio.search",
+            maxsize=int(os.getenv('PASSIO_SEARCH_CACHE_SIZE', '5000')),
+            ttl_seconds=float(os.getenv('PASSIO_SEARCH_CACHE_TTL', '1800')),
+            shared=shared_cache
+        )
+        # barcode -> food ID; the details themselves live in details_cache under that ID
+        self.barcode_cache = TieredCache(
+            "passio.barcode",
+            maxsize=int(os.getenv('PASSIO_BARCODE_CACHE_SIZE', '2000')),
+            ttl_seconds=float(os.getenv('PASSIO_DETAILS_CACHE_TTL', '3600')),
+            shared=shared_cache
+        )
+        # Search pages being fetched in the background, by cache key; holding the task keeps it from
+        # being garbage collected mid-flight
+        self._prefetching: Dict[str, asyncio.Task] = {}
+        
+    @traced("passio.search_food", kind=SPAN_KIND_CLIENT, attributes={"cache.hit": False})
+    async def search_food(self, query: str, limit: int = 20, offset: int = 0,
+                          fallback: bool = True, canonicalize: bool = True) -> Optional[List[Dict[str, Any]]]:
+        """
+        Search for food items using Passio API, one page of `limit` results starting at `offset`
         Returns normalized food data compatible with SugarDrop
+        When Passio is unavailable, returns canned fallback results, or None if fallback is False
+        Equivalent queries ("Apples", "red apple") share one canonical cache key and upstream call;
+        canonicalize=False sends the text as typed (a typeahead prefix like "pop" isn't "cola")
+        """
+        term = canonicalize_query(query) if canonicalize else " ".join(query.lower().split())
+        cache_key = f"{term}|{limit}|{offset}"
+        cached = self.search_cache.get(cache_key)
+        query_key_stats.record(f"{query}|{limit}|{offset}", cache_key, cached is not None)
+        tracer.set_attribute("cache.hit", cached is not None)
+        if cached is not None:
+            return cached
+        
+        results = await self._fetch_search_page(term, limit, offset)
+        if results is None and fallback:
+            # Canned results only make sense as a first page
+            return self._get_fallback_results(query) if offset == 0 else []
+        return results
+    
+    def prefetch_search_page(self, query: str, limit: int, offset: int):
+        """
+        Warm the cache for a search page in the background (e.g. the next page while the user reads this one)
+        """
+        term = canonicalize_query(query)
+        cache_key = f"{term}|{limit}|{offset}"
+        if cache_key in self._prefetching or self.search_cache.get(cache_key) is not None:
+            return
+        # A fresh context: the prefetch isn't part of the current request's metrics or trace
+        task = contextvars.Context().run(
+            asyncio.get_running_loop().create_task, self._fetch_search_page(term, limit, offset)
+        )
+        self._prefetching[cache_key] = task
+        task.add_done_callback(lambda _: self._prefetching.pop(cache_key, None))
+    
+    async def _fetch_search_page(self, term: str, limit: int, offset: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        One Passio search request; caches and returns the page, or None if Passio is unavailable
         """
         try:
             async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/products/napi/food/search/advanced",
-                    headers=self.headers,
-                    params={
-                        "term": query,
-                        "limit": limit
-                    },
-                    timeout=10.0
-                )
+                with track_call("passio"):
+                    response = await client.get(
+                        f"{self.base_url}/products/napi/food/search/advanced",
+                        headers=self.headers,
+                        params={
+                            "term": term,
+                            "limit": limit,
+                            "offset": offset
+                        },
+                        timeout=10.0
+                    )
+                tracer.set_attribute("http.status_code", response.status_code)
                 
                 if response.status_code == 200:
                     data = response.json()
-                    return self._normalize_search_results(data)
+                    results = self._normalize_search_results(data, limit)
+                    self.search_cache.set(f"{term}|{limit}|{offset}", results)
+                    return results
                 else:
-                    logger.error(f"Passio API error: {response.status_code} - {response.text}")
-                    return self._get_fallback_results(query)
+                    logger.error("Passio API error: %s - %s", response.status_code, truncate_for_log(response.text))
+                    return None
                     
         except Exception as e:
-            logger.error(f"Error searching food with Passio: {str(e)}")
-            return self._get_fallback_results(query)
+            logger.error("Error searching food with Passio: %s", e)
+            return None
     
+    @traced("passio.get_food_details", kind=SPAN_KIND_CLIENT, attributes={"cache.hit": False})
     async def get_food_details(self, food_id: str) -> Optional[Dict[str, Any]]:
         """
         Get detailed nutrition information for a specific food item
         """
+        cached = self.details_cache.get(food_id)
+        tracer.set_attribute("cache.hit", cached is not None)
+        if cached is not None:
+            return cached
+        if is_synthetic_food_id(food_id):
+            # Locally minted IDs only resolve through the cache
+            return None
+        
         try:
             async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/products/napi/food/{food_id}",
-                    headers=self.headers,
-                    timeout=10.0
-                )
+                with track_call("passio"):
+                    response = await client.get(
+                        f"{self.base_url}/products/napi/food/{food_id}",
+                        headers=self.headers,
+                        timeout=10.0
+                    )
+                tracer.set_attribute("http.status_code", response.status_code)
                 
                 if response.status_code == 200:
                     data = response.json()
-                    return self._normalize_food_details(data)
+                    details = self._normalize_food_details(data)
+                    if details:
+                        self.details_cache.set(food_id, details)
+                    return details
                 else:
-                    logger.error(f"Passio API error for food details: {response.status_code}")
+                    logger.error("Passio API error for food details: %s", response.status_code)
                     return None
                     
         except Exception as e:
-            logger.error(f"Error getting food details from Passio: {str(e)}")
+            logger.error("Error getting food details from Passio: %s", e)
             return None
     
-    async def recognize_food_from_image(self, image_data: bytes) -> List[Dict[str, Any]]:
+    async def get_food_details_many(self, food_ids: List[str], max_concurrency: int = 3) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Fetch details for several foods concurrently, with bounded fan-out
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        unique_ids = list(dict.fromkeys(food_id for food_id in food_ids if food_id))
+        
+        async def fetch(food_id: str):
+            async with semaphore:
+                return await self.get_food_details(food_id)
+        
+        details = await asyncio.gather(*(fetch(food_id) for food_id in unique_ids))
+        return dict(zip(unique_ids, details))
+    
+    @traced("passio.recognize_food_from_image", kind=SPAN_KIND_CLIENT, attributes={"cache.hit": False})
+    async def recognize_food_from_image(self, image_data: bytes, filename: str = "food.jpg",
+                                        content_type: str = "image/jpeg") -> List[Dict[str, Any]]:
         """
         Recognize food from image using Passio AI
         """
         try:
             async with httpx.AsyncClient() as client:
-                files = {"image": ("food.jpg", image_data, "image/jpeg")}
+                files = {"image": (filename, image_data, content_type)}
                 headers = {"Authorization": f"Bearer {self.api_key}"}
                 
-                response = await client.post(
-                    f"{self.base_url}/products/napi/food/recognize",
-                    headers=headers,
-                    files=files,
-                    timeout=15.0
-                )
+                with track_call("passio"):
+                    response = await client.post(
+                        f"{self.base_url}/products/napi/food/recognize",
+                        headers=headers,
+                        files=files,
+                        timeout=15.0
+                    )
+                tracer.set_attribute("http.status_code", response.status_code)
                 
                 if response.status_code == 200:
                     data = response.json()
                     return self._normalize_recognition_results(data)
                 else:
-                    logger.error(f"Passio image recognition error: {response.status_code}")
+                    logger.error("Passio image recognition error: %s", response.status_code)
                     return []
                     
         except Exception as e:
-            logger.error(f"Error recognizing food image: {str(e)}")
+            logger.error("Error recognizing food image: %s", e)
             return []
     
+    @traced("passio.get_barcode_nutrition", kind=SPAN_KIND_CLIENT, attributes={"cache.hit": False})
     async def get_barcode_nutrition(self, barcode: str) -> Optional[Dict[str, Any]]:
         """
         Get nutrition information from barcode
         """
+        food_id = self.barcode_cache.get(barcode)
+        cached = self.details_cache.get(food_id) if food_id else None
+        tracer.set_attribute("cache.hit", cached is not None)
+        if cached is not None:
+            return cached
+        
         try:
             async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/products/napi/food/barcode/{barcode}",
-                    headers=self.headers,
-                    timeout=10.0
-                )
+                with track_call("passio"):
+                    response = await client.get(
+                        f"{self.base_url}/products/napi/food/barcode/{barcode}",
+                        headers=self.headers,
+                        timeout=10.0
+                    )
+                tracer.set_attribute("http.status_code", response.status_code)
                 
                 if response.status_code == 200:
                     data = response.json()
-                    return self._normalize_food_details(data)
+                    details = self._normalize_food_details(data)
+                    if details:
+                        self.details_cache.set(details["id"], details)
+                        self.barcode_cache.set(barcode, details["id"])
+                    return details
                 else:
-                    logger.error(f"Passio barcode API error: {response.status_code}")
+                    logger.error("Passio barcode API error: %s", response.status_code)
                     return None
                     
         except Exception as e:
-            logger.error(f"Error getting barcode nutrition: {str(e)}")
+            logger.error("Error getting barcode nutrition: %s", e)
             return None
     
-    async def get_popular_foods(self, category: str = None, limit: int = 20) -> List[Dict[str, Any]]:
+    @traced("passio.get_popular_foods", kind=SPAN_KIND_CLIENT, attributes={"cache.hit": False})
+    async def get_popular_foods(self, category: str = None, limit: int = 20,
+                                fallback: bool = True) -> Optional[List[Dict[str, Any]]]:
         """
         Get popular/trending foods
+        When Passio is unavailable, returns canned fallback results, or None if fallback is False
         """
         try:
             params = {"limit": limit}
@@ -132,24 +271,26 @@ class PassioService:
                 params["category"] = category
                 
             async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/products/napi/food/popular",
-                    headers=self.headers,
-                    params=params,
-                    timeout=10.0
-                )
+                with track_call("passio"):
+                    response = await client.get(
+                        f"{self.base_url}/products/napi/food/popular",
+                        headers=self.headers,
+                        params=params,
+                        timeout=10.0
+                    )
+                tracer.set_attribute("http.status_code", response.status_code)
                 
                 if response.status_code == 200:
                     data = response.json()
-                    return self._normalize_search_results(data)
+                    return self._normalize_search_results(data, limit)
                 else:
-                    return self._get_popular_fallback(category)
+                    logger.error("Passio popular foods API error: %s", response.status_code)
                     
         except Exception as e:
-            logger.error(f"Error getting popular foods: {str(e)}")
-            return self._get_popular_fallback(category)
+            logger.error("Error getting popular foods: %s", e)
+        return self.get_popular_fallback(category) if fallback else None
     
-    def _normalize_search_results(self, data: Any) -> List[Dict[str, Any]]:
+    def _normalize_search_results(self, data: Any, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Normalize Passio search results to SugarDrop SugarPoints format
         """
@@ -158,30 +299,26 @@ class PassioService:
         # Handle different response formats from Passio
         items = data.get('results', []) if isinstance(data, dict) else data
         
-        for item in items[:20]:  # Limit to 20 results
+        # Passio honors limit, but never hand back more than the caller asked for
+        items = items[:limit] if limit else items
+        # Nutrition values for SugarPoints system (sugar is the legacy field, kept for backward compatibility)
+        nutrition = self._nutrition_fields(items)
+        for item, fields in zip(items, nutrition):
+            if fields is None:
+                continue
             try:
-                # Extract nutrition values for SugarPoints system
-                carbs_per_100g = self._extract_carbs_content(item)
-                fat_per_100g = self._extract_fat_content(item)
-                protein_per_100g = self._extract_protein_content(item)
-                
                 normalized_item = {
-                    "id": item.get("passio_id", str(hash(item.get("name", "")))),
+                    "id": item.get("passio_id") or stable_food_id(item.get("name", ""), item.get("brand_name")),
                     "name": item.get("name", "Unknown Food"),
                     "brand": item.get("brand_name"),
-                    # New SugarPoints system fields
-                    "carbs_per_100g": carbs_per_100g,
-                    "fat_per_100g": fat_per_100g,
-                    "protein_per_100g": protein_per_100g,
-                    # Legacy field for backward compatibility
-                    "sugar_per_100g": self._extract_sugar_content(item),
+                    **fields,
                     "category": item.get("food_type", "General"),
                     "serving_sizes": self._extract_serving_sizes(item),
                     "confidence": item.get("confidence", 1.0)
                 }
                 normalized.append(normalized_item)
             except Exception as e:
-                logger.warning(f"Error normalizing food item: {str(e)}")
+                logger.warning("Error normalizing food item: %s", e)
                 continue
                 
         return normalized
@@ -191,11 +328,14 @@ class PassioService:
         Normalize detailed food information to SugarDrop format
         """
         try:
+            fields = self._nutrition_fields([data])[0]
+            if fields is None:
+                return None
             return {
-                "id": data.get("passio_id", ""),
+                "id": data.get("passio_id") or stable_food_id(data.get("name", ""), data.get("brand_name")),
                 "name": data.get("name", "Unknown Food"),
                 "brand": data.get("brand_name"),
-                "sugar_per_100g": self._extract_sugar_content(data),
+                **fields,
                 "calories_per_100g": self._extract_calories(data),
                 "category": data.get("food_type", "General"),
                 "nutrients": self._extract_detailed_nutrients(data),
@@ -204,7 +344,7 @@ class PassioService:
                 "allergens": data.get("allergens", [])
             }
         except Exception as e:
-            logger.error(f"Error normalizing food details: {str(e)}")
+            logger.error("Error normalizing food details: %s", e)
             return None
     
     def _normalize_recognition_results(self, data: Any) -> List[Dict[str, Any]]:
@@ -214,13 +354,16 @@ class PassioService:
         normalized = []
         
         recognitions = data.get('recognitions', []) if isinstance(data, dict) else data
+        recognitions = recognitions[:5]  # Limit to top 5 recognitions
         
-        for item in recognitions[:5]:  # Limit to top 5 recognitions
+        for item, fields in zip(recognitions, self._nutrition_fields(recognitions)):
+            if fields is None:
+                continue
             try:
                 normalized_item = {
-                    "id": item.get("passio_id", ""),
+                    "id": item.get("passio_id") or stable_food_id(item.get("name", "")),
                     "name": item.get("name", "Unknown Food"),
-                    "sugar_per_100g": self._extract_sugar_content(item),
+                    **fields,
                     "calories_per_100g": self._extract_calories(item),
                     "confidence": item.get("confidence", 0.0),
                     "estimated_weight": item.get("portion_weight", 100),
@@ -228,12 +371,47 @@ class PassioService:
                 }
                 normalized.append(normalized_item)
             except Exception as e:
-                logger.warning(f"Error normalizing recognition result: {str(e)}")
+                logger.warning("Error normalizing recognition result: %s", e)
                 continue
                 
         return normalized
     
-    def _extract_carbs_content(self, item: Dict) -> float:
+    def _nutrition_fields(self, items: List[Dict]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Carbs, fat, protein and sugar per 100g for each item (None for an item that can't be read)
+        Whatever Passio left out is estimated from the nearest catalog foods, in one batch per response,
+        and flagged with nutrients_estimated, estimated_fields (which ones) and estimate_confidence
+        """
+        nutrition = []
+        for item in items:
+            try:
+                nutrition.append({
+                    "carbs_per_100g": self._extract_carbs_content(item),
+                    "fat_per_100g": self._extract_fat_content(item),
+                    "protein_per_100g": self._extract_protein_content(item),
+                    "sugar_per_100g": self._extract_sugar_content(item),
+                    "nutrients_estimated": False,
+                    "estimated_fields": []
+                })
+            except Exception as e:
+                logger.warning("Error reading nutrients for food item: %s", e)
+                nutrition.append(None)
+
+        missing = [index for index, fields in enumerate(nutrition) if fields is not None and None in fields.values()]
+        if not missing:
+            return nutrition
+        estimates = nutrient_estimator.estimate_many([str(items[index].get("name") or "") for index in missing])
+        for index, estimate in zip(missing, estimates):
+            fields = nutrition[index]
+            estimated_fields = [field for field, value in fields.items() if value is None]
+            for field in estimated_fields:
+                fields[field] = estimate[field]
+            fields["nutrients_estimated"] = True
+            fields["estimated_fields"] = estimated_fields
+            fields["estimate_confidence"] = estimate["confidence"]
+        return nutrition
+
+    def _extract_carbs_content(self, item: Dict) -> Optional[float]:
         """
         Extract total carbohydrate content per 100g from Passio response
         """
@@ -256,10 +434,10 @@ class PassioService:
                         value = unit_nutrients[key]
                         return float(value.get("quantity", 0) if isinstance(value, dict) else value)
         
-        # Default fallback based on food type
-        return self._estimate_carb_content(item.get("name", ""))
+        # Not reported: estimated in _nutrition_fields
+        return None
 
-    def _extract_fat_content(self, item: Dict) -> float:
+    def _extract_fat_content(self, item: Dict) -> Optional[float]:
         """
         Extract fat content per 100g from Passio response
         """
@@ -282,10 +460,10 @@ class PassioService:
                         value = unit_nutrients[key]
                         return float(value.get("quantity", 0) if isinstance(value, dict) else value)
         
-        # Default fallback
-        return self._estimate_fat_content(item.get("name", ""))
+        # Not reported: estimated in _nutrition_fields
+        return None
 
-    def _extract_protein_content(self, item: Dict) -> float:
+    def _extract_protein_content(self, item: Dict) -> Optional[float]:
         """
         Extract protein content per 100g from Passio response
         """
@@ -308,70 +486,10 @@ class PassioService:
                         value = unit_nutrients[key]
                         return float(value.get("quantity", 0) if isinstance(value, dict) else value)
         
-        # Default fallback
-        return self._estimate_protein_content(item.get("name", ""))
+        # Not reported: estimated in _nutrition_fields
+        return None
 
-    def _estimate_carb_content(self, food_name: str) -> float:
-        """
-        Estimate carbohydrate content based on food name when not available
-        """
-        name_lower = food_name.lower()
-        
-        # High carb foods
-        if any(word in name_lower for word in ["bread", "pasta", "rice", "potato", "cereal", "oats"]):
-            return 70.0
-        # Medium-high carb foods  
-        elif any(word in name_lower for word in ["fruit", "apple", "banana", "orange", "berry"]):
-            return 15.0
-        # Medium carb foods
-        elif any(word in name_lower for word in ["vegetable", "carrot", "pea", "corn"]):
-            return 8.0
-        # Low carb foods
-        elif any(word in name_lower for word in ["meat", "chicken", "fish", "egg", "cheese"]):
-            return 2.0
-        # Default
-        else:
-            return 10.0
-
-    def _estimate_fat_content(self, food_name: str) -> float:
-        """
-        Estimate fat content based on food name when not available
-        """
-        name_lower = food_name.lower()
-        
-        # High fat foods
-        if any(word in name_lower for word in ["oil", "butter", "nuts", "avocado", "cheese"]):
-            return 80.0
-        # Medium fat foods
-        elif any(word in name_lower for word in ["meat", "chicken", "fish", "egg"]):
-            return 10.0
-        # Low fat foods
-        elif any(word in name_lower for word in ["fruit", "vegetable", "bread", "pasta", "rice"]):
-            return 1.0
-        # Default
-        else:
-            return 5.0
-
-    def _estimate_protein_content(self, food_name: str) -> float:
-        """
-        Estimate protein content based on food name when not available
-        """
-        name_lower = food_name.lower()
-        
-        # High protein foods
-        if any(word in name_lower for word in ["meat", "chicken", "fish", "egg", "protein"]):
-            return 25.0
-        # Medium protein foods
-        elif any(word in name_lower for word in ["cheese", "milk", "yogurt", "nuts", "beans"]):
-            return 8.0
-        # Low protein foods
-        elif any(word in name_lower for word in ["fruit", "vegetable", "bread", "pasta", "rice"]):
-            return 3.0
-        # Default
-        else:
-            return 5.0
-
-    def _extract_sugar_content(self, item: Dict) -> float:
+    def _extract_sugar_content(self, item: Dict) -> Optional[float]:
         """
         Extract sugar content from various Passio response formats
         """
@@ -395,8 +513,8 @@ class PassioService:
                         value = unit_nutrients[key]
                         return float(value.get("quantity", 0) if isinstance(value, dict) else value)
         
-        # Default fallback based on food type
-        return self._estimate_sugar_content(item.get("name", ""))
+        # Not reported: estimated in _nutrition_fields
+        return None
     
     def _extract_calories(self, item: Dict) -> float:
         """
@@ -475,25 +593,6 @@ class PassioService:
         
         return detailed
     
-    def _estimate_sugar_content(self, food_name: str) -> float:
-        """
-        Estimate sugar content based on food name when not available
-        """
-        name_lower = food_name.lower()
-        
-        # High sugar foods
-        if any(word in name_lower for word in ["candy", "chocolate", "cake", "cookie", "donut", "soda", "juice"]):
-            return 25.0
-        # Medium sugar foods
-        elif any(word in name_lower for word in ["fruit", "apple", "banana", "orange", "berry"]):
-            return 12.0
-        # Low sugar foods
-        elif any(word in name_lower for word in ["vegetable", "meat", "chicken", "fish", "egg"]):
-            return 2.0
-        # Default
-        else:
-            return 5.0
-    
     def _get_fallback_results(self, query: str) -> List[Dict[str, Any]]:
         """
         Provide fallback results when Passio API is unavailable with SugarPoints format
@@ -501,7 +600,7 @@ class PassioService:
         # Enhanced fallback database with SugarPoints nutrition format
         fallback_foods = [
             {
-                "id": f"fallback_{hash(query + 'apple')}",
+                "id": stable_food_id("Apple", source="fallback"),
                 "name": "Apple",
                 "brand": None,
                 "carbs_per_100g": 14.0,
@@ -512,7 +611,7 @@ class PassioService:
                 "confidence": 0.8
             },
             {
-                "id": f"fallback_{hash(query + 'banana')}",
+                "id": stable_food_id("Banana", source="fallback"),
                 "name": "Banana",
                 "brand": None,
                 "carbs_per_100g": 23.0,
@@ -523,7 +622,7 @@ class PassioService:
                 "confidence": 0.8
             },
             {
-                "id": f"fallback_{hash(query + 'orange')}",
+                "id": stable_food_id("Orange", source="fallback"),
                 "name": "Orange",
                 "brand": None,
                 "carbs_per_100g": 12.0,
@@ -534,7 +633,7 @@ class PassioService:
                 "confidence": 0.8
             },
             {
-                "id": f"fallback_{hash(query + 'chicken')}",
+                "id": stable_food_id("Chicken Breast", source="fallback"),
                 "name": "Chicken Breast",
                 "brand": None,
                 "carbs_per_100g": 0.0,
@@ -545,7 +644,7 @@ class PassioService:
                 "confidence": 0.7
             },
             {
-                "id": f"fallback_{hash(query + 'rice')}",
+                "id": stable_food_id("White Rice", source="fallback"),
                 "name": "White Rice",
                 "brand": None,
                 "carbs_per_100g": 28.0,
@@ -563,7 +662,7 @@ class PassioService:
         
         return filtered if filtered else fallback_foods[:3]
 
-    def _get_popular_fallback(self, category: str = None) -> List[Dict[str, Any]]:
+    def get_popular_fallback(self, category: str = None) -> List[Dict[str, Any]]:
         """
         Provide popular foods fallback with SugarPoints format
         """
@@ -0,0 +1,173 @@
+"""
+Popular Foods
+Popular foods per category, refreshed in the background and served as immutable pre-serialized responses
+"""
+
+import os
+import json
+import asyncio
+import hashlib
+import logging
+from typing import Awaitable, Callable, List, Dict, Optional, Tuple, Any
+
+from shared_cache import shared_cache, TieredCache
+from passio_service import passio_service
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class PopularResponse:
+    """
+    One serialized /api/food/popular body and its ETag; never mutated once built
+    """
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+class PopularSnapshot:
+    def __init__(self, category: Optional[str], results: List[Dict[str, Any]], degraded: bool = False):
+        self.category = category
+        self.results = tuple(results)
+        # Canned fallback served while Passio is unreachable; replaced by the first successful fetch
+        self.degraded = degraded
+
+    @property
+    def source(self) -> str:
+        return "fallback" if self.degraded else "passio_ai"
+        # limit -> PopularResponse, built on first use
+        self._responses: Dict[int, PopularResponse] = {}
+
+    def response(self, limit: int) -> PopularResponse:
+        response = self._responses.get(limit)
+        if response is None:
+            results = list(self.results[:limit])
+            body = json.dumps({
+                "results": results,
+                "category": self.category,
+                "count": len(results),
+                "source": self.source
+            }, separators=(",", ":")).encode()
+            response = self._responses[limit] = PopularResponse(body)
+        return response
+
+class PopularFoodsCache:
+    def __init__(self, fetch: Callable[[Optional[str], int], Awaitable[Optional[List[Dict[str, Any]]]]],
+                 fallback: Callable[[Optional[str]], List[Dict[str, Any]]],
+                 categories: List[Optional[str]], refresh_interval_seconds: float = 900.0,
+                 max_limit: int = 50, max_categories: int = 32):
+        # fetch returns None when Passio is unavailable; fallback is only served when there's nothing better
+        self.fetch = fetch
+        self.fallback = fallback
+        self.categories = categories
+        self.refresh_interval = refresh_interval_seconds
+        self.max_limit = max_limit
+        self.max_categories = max_categories
+        self._snapshots: Dict[str, PopularSnapshot] = {}
+        self._loading: Dict[str, asyncio.Task] = {}
+        # Lets a freshly started worker serve the last refresh from any worker before its own completes
+        self._shared = TieredCache("popular_foods", maxsize=max_categories, ttl_seconds=refresh_interval_seconds * 4,
+                                   shared=shared_cache)
+        self._task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+        self.on_demand_loads = 0
+        self.failed_fetches = 0
+
+    @staticmethod
+    def _key(category: Optional[str]) -> str:
+        return category.strip().lower() if category else ""
+
+    async def response(self, category: Optional[str], limit: int) -> PopularResponse:
+        snapshot = await self._snapshot(category)
+        return snapshot.response(max(1, min(limit, self.max_limit)))
+
+    async def results(self, category: Optional[str], limit: int) -> Tuple[List[Dict[str, Any]], str]:
+        """
+        (results, source), where source is "fallback" while only the canned list is available
+        """
+        snapshot = await self._snapshot(category)
+        return list(snapshot.results[:max(1, min(limit, self.max_limit))]), snapshot.source
+
+    async def _snapshot(self, category: Optional[str]) -> PopularSnapshot:
+        key = self._key(category)
+        snapshot = self._snapshots.get(key)
+        if snapshot is not None and not snapshot.degraded:
+            return snapshot
+        cached = self._shared.get(key)
+        if cached is not None:
+            snapshot = self._snapshots[key] = PopularSnapshot(category, cached)
+            return snapshot
+        if snapshot is not None:
+            return snapshot
+        # Not refreshed yet (or an unlisted category): load once, concurrent requests share the fetch
+        task = self._loading.get(key)
+        if task is None:
+            self.on_demand_loads += 1
+            task = self._loading[key] = asyncio.get_running_loop().create_task(self._load(category))
+            task.add_done_callback(lambda _: self._loading.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _load(self, category: Optional[str]) -> PopularSnapshot:
+        key = self._key(category)
+        results = await self.fetch(category, self.max_limit)
+        if results is None:
+            self.failed_fetches += 1
+            previous = self._snapshots.get(key)
+            if previous is not None:
+                return previous
+            # Nothing to keep serving yet: the canned list, in memory only so no worker starts from it
+            snapshot = PopularSnapshot(category, self.fallback(category), degraded=True)
+        else:
+            snapshot = PopularSnapshot(category, results)
+        if key in self._snapshots or len(self._snapshots) < self.max_categories:
+            self._snapshots[key] = snapshot
+            if not snapshot.degraded:
+                self._shared.set(key, results)
+        return snapshot
+
+    async def refresh(self):
+        """
+        Rebuild every configured category plus any requested since startup; a failed fetch keeps the old snapshot
+        """
+        categories = {self._key(category): category for category in self.categories}
+        for snapshot in self._snapshots.values():
+            categories.setdefault(self._key(snapshot.category), snapshot.category)
+        for category in categories.values():
+            try:
+                await self._load(category)
+            except Exception as e:
+                logger.warning("Popular foods refresh failed for %s: %s", category or "all", e)
+        self.refreshes += 1
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh_loop(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "categories": sorted(self._snapshots.keys()),
+            "refreshes": self.refreshes,
+            "on_demand_loads": self.on_demand_loads,
+            "failed_fetches": self.failed_fetches,
+            "degraded_categories": sorted(key for key, snapshot in self._snapshots.items() if snapshot.degraded),
+            "refresh_interval_seconds": self.refresh_interval
+        }
+
+# Global instance; POPULAR_FOOD_CATEGORIES is comma-separated and an empty item means "all categories"
+popular_foods = PopularFoodsCache(
+    lambda category, limit: passio_service.get_popular_foods(category, limit, fallback=False),
+    passio_service.get_popular_fallback,
+    categories=[item.strip() or None for item in os.getenv('POPULAR_FOOD_CATEGORIES', ',Fruits,Protein,Grains').split(',')],
+    refresh_interval_seconds=float(os.getenv('POPULAR_FOODS_REFRESH_SECONDS', '900'))
+)
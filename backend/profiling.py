@@ -0,0 +1,156 @@
+"""
+On-demand Profiling
+Low-overhead sampling CPU profiler (collapsed-stack output) and tracemalloc snapshot diffs
+"""
+
+import sys
+import time
+import threading
+import tracemalloc
+import logging
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import List, Dict, Optional, Any
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class SamplingProfiler:
+    """
+    Samples every thread's stack at a fixed interval, producing the collapsed-stack format
+    understood by flamegraph.pl and speedscope ("frame;frame;frame count")
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    def profile(self, duration_seconds: float, interval_ms: float = 5.0) -> str:
+        """
+        Blocking: run from a worker thread so the event loop itself gets sampled
+        """
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profiling session is already running")
+        try:
+            stacks: Counter = Counter()
+            own_thread = threading.get_ident()
+            thread_names = {}
+            interval = interval_ms / 1000
+            deadline = time.monotonic() + duration_seconds
+
+            while time.monotonic() < deadline:
+                for thread in threading.enumerate():
+                    thread_names[thread.ident] = thread.name
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_thread:
+                        continue
+                    stacks[self._collapse(frame, thread_names.get(thread_id, str(thread_id)))] += 1
+                time.sleep(interval)
+
+            return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
+        finally:
+            self._lock.release()
+
+    def _collapse(self, frame, thread_name: str) -> str:
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})".replace(";", ":"))
+            frame = frame.f_back
+        frames.append(thread_name.replace(";", ":"))
+        return ";".join(reversed(frames))
+
+class MemorySnapshots:
+    """
+    Keeps a bounded set of tracemalloc snapshots so growth can be diffed over uptime
+    """
+    def __init__(self, max_snapshots: int = 5, traceback_frames: int = 10):
+        self.max_snapshots = max_snapshots
+        self.traceback_frames = traceback_frames
+        self._snapshots: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 1
+
+    def take(self) -> Dict[str, Any]:
+        """
+        Take a snapshot (starts tracing on first use; later snapshots only see allocations made after that)
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.traceback_frames)
+            logger.info("tracemalloc started with %d frames", self.traceback_frames)
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot_id = str(self._next_id)
+        self._next_id += 1
+        self._snapshots[snapshot_id] = {
+            "snapshot": snapshot,
+            "taken_at": datetime.utcnow().isoformat(),
+            "traced_bytes": current,
+            "peak_bytes": peak
+        }
+        while len(self._snapshots) > self.max_snapshots:
+            self._snapshots.popitem(last=False)
+        return self.describe(snapshot_id)
+
+    def stop(self) -> Dict[str, Any]:
+        """
+        Stop tracing and drop every snapshot; tracing costs memory and CPU on every allocation until stopped
+        """
+        was_tracing = tracemalloc.is_tracing()
+        if was_tracing:
+            tracemalloc.stop()
+            logger.info("tracemalloc stopped")
+        dropped = len(self._snapshots)
+        self._snapshots.clear()
+        return {"stopped": was_tracing, "dropped_snapshots": dropped}
+
+    def describe(self, snapshot_id: str) -> Dict[str, Any]:
+        entry = self._snapshots[snapshot_id]
+        return {
+            "id": snapshot_id,
+            "taken_at": entry["taken_at"],
+            "traced_bytes": entry["traced_bytes"],
+            "peak_bytes": entry["peak_bytes"]
+        }
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [self.describe(snapshot_id) for snapshot_id in self._snapshots]
+
+    def diff(self, base_id: str, target_id: Optional[str] = None, limit: int = 25, group_by: str = "lineno") -> Dict[str, Any]:
+        """
+        Compare two snapshots (target defaults to the most recent one)
+        """
+        if base_id not in self._snapshots:
+            raise KeyError(base_id)
+        if target_id is None:
+            target_id = next(reversed(self._snapshots))
+        if target_id not in self._snapshots:
+            raise KeyError(target_id)
+
+        base = self._snapshots[base_id]["snapshot"]
+        target = self._snapshots[target_id]["snapshot"]
+        stats = target.compare_to(base, group_by)
+        return {
+            "base": self.describe(base_id),
+            "target": self.describe(target_id),
+            "total_size_diff": sum(stat.size_diff for stat in stats),
+            "top": [
+                {
+                    "location": str(stat.traceback),
+                    "size_diff": stat.size_diff,
+                    "size": stat.size,
+                    "count_diff": stat.count_diff,
+                    "count": stat.count
+                }
+                for stat in stats[:limit]
+            ]
+        }
+
+# Global instances
+sampling_profiler = SamplingProfiler()
+memory_snapshots = MemorySnapshots()
@@ -0,0 +1,152 @@
+"""
+Query Normalizer
+Canonical food search queries (case/whitespace folding, plural stemming, stop words, synonyms) so that
+equivalent searches share one cache key and one upstream call
+"""
+
+import re
+import logging
+from typing import List, Dict, Any
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+STOP_WORDS = {
+    "a", "an", "the", "of", "with", "and", "in", "on", "for", "some", "fresh", "plain", "serving", "portion",
+    "piece", "slice", "cup", "bowl", "glass"
+}
+
+# Words that end in "s" but aren't plurals
+NON_PLURALS = {"molasses", "grits", "brussels", "series", "species", "swiss", "hummus", "couscous", "asparagus"}
+
+# Singulars ending in "ie", whose plurals would otherwise stem to "-y" ("cookies" -> "cooky")
+IE_SINGULARS = {"cookie", "brownie", "smoothie", "veggie", "goodie", "sweetie", "pie"}
+
+# Curated synonyms, valued in canonical form (keys are canonicalized at import). A single-word key only
+# applies when it is the whole query ("pop" is cola, "pop tarts" isn't); multi-word keys also replace
+# that exact run of words inside a longer query
+SYNONYMS = {
+    "red apple": "apple",
+    "green apple": "apple",
+    "granny smith apple": "apple",
+    "gala apple": "apple",
+    "coke": "cola",
+    "soda": "cola",
+    "soft drink": "cola",
+    "pop": "cola",
+    "yoghurt": "yogurt",
+    "greek yoghurt": "greek yogurt",
+    "porridge": "oatmeal",
+    "rolled oats": "oatmeal",
+    "prawn": "shrimp",
+    "mince": "ground beef",
+    "minced beef": "ground beef",
+    "aubergine": "eggplant",
+    "courgette": "zucchini",
+    "garbanzo": "chickpea",
+    "garbanzo bean": "chickpea",
+    "crisp": "potato chip",
+    "chicken breast fillet": "chicken breast",
+    "spud": "potato",
+    "biscuit": "cookie",
+    "doughnut": "donut",
+    "candy bar": "chocolate bar",
+    "sweetcorn": "sweet corn",
+    "maize": "sweet corn",
+    "ice-cream": "ice cream",
+    "icecream": "ice cream",
+    "oj": "orange juice"
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9'\-]*")
+
+def _singular(word: str) -> str:
+    if word in NON_PLURALS or len(word) <= 3 or not word.endswith("s"):
+        return word
+    if word.endswith("ies") and word[:-1] in IE_SINGULARS:
+        return word[:-1]
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "sses", "xes", "zes")):
+        return word[:-2]
+    if word.endswith(("ss", "us", "is")):
+        return word
+    return word[:-1]
+
+def _canonical_tokens(text: str) -> List[str]:
+    tokens = [_singular(token) for token in _TOKEN_PATTERN.findall(text.lower())]
+    meaningful = [token for token in tokens if token not in STOP_WORDS]
+    # A query made only of stop words ("the") still has to search for something
+    return meaningful or tokens
+
+# SYNONYMS keyed the way queries are canonicalized, so "rolled oats" matches as "rolled oat"
+_CANONICAL_SYNONYMS = {" ".join(_canonical_tokens(key)): value for key, value in SYNONYMS.items()}
+# Multi-word keys as token tuples, longest first
+_PHRASE_SYNONYMS = sorted(
+    (tuple(key.split()) for key in _CANONICAL_SYNONYMS if " " in key), key=len, reverse=True
+)
+
+def canonicalize_query(query: str) -> str:
+    """
+    "  Red APPLES " -> "apple"; returns "" for an empty query
+    """
+    tokens = _canonical_tokens(query)
+    if not tokens:
+        return " ".join(query.lower().split())
+    phrase = " ".join(tokens)
+    if phrase in _CANONICAL_SYNONYMS:
+        return _CANONICAL_SYNONYMS[phrase]
+    canonical = []
+    position = 0
+    while position < len(tokens):
+        for key in _PHRASE_SYNONYMS:
+            if tuple(tokens[position:position + len(key)]) == key:
+                canonical.append(_CANONICAL_SYNONYMS[" ".join(key)])
+                position += len(key)
+                break
+        else:
+            canonical.append(tokens[position])
+            position += 1
+    return " ".join(canonical)
+
+class QueryKeyStats:
+    """
+    Measures what canonicalization buys: distinct raw vs canonical keys, and cache hits that only
+    happened because two different raw queries shared a canonical key
+    """
+    def __init__(self, max_tracked_keys: int = 100000):
+        self.max_tracked_keys = max_tracked_keys
+        self._raw_keys = set()
+        self._canonical_keys = set()
+        self.lookups = 0
+        self.hits = 0
+        self.canonical_only_hits = 0
+
+    def record(self, raw_key: str, canonical_key: str, hit: bool):
+        self.lookups += 1
+        raw_seen = raw_key in self._raw_keys
+        if hit:
+            self.hits += 1
+            if not raw_seen:
+                self.canonical_only_hits += 1
+        if len(self._raw_keys) < self.max_tracked_keys:
+            self._raw_keys.add(raw_key)
+        if len(self._canonical_keys) < self.max_tracked_keys:
+            self._canonical_keys.add(canonical_key)
+
+    def stats(self) -> Dict[str, Any]:
+        raw_keys = len(self._raw_keys)
+        canonical_keys = len(self._canonical_keys)
+        return {
+            "lookups": self.lookups,
+            "raw_keys": raw_keys,
+            "canonical_keys": canonical_keys,
+            "key_space_reduction": round(1 - canonical_keys / raw_keys, 3) if raw_keys else None,
+            "hit_ratio": round(self.hits / self.lookups, 3) if self.lookups else None,
+            # What the hit ratio would have been keyed on the raw query (an upper bound: raw keys can expire too)
+            "raw_key_hit_ratio": round((self.hits - self.canonical_only_hits) / self.lookups, 3) if self.lookups else None,
+            "tracking_capped": raw_keys >= self.max_tracked_keys
+        }
+
+# Global instance
+query_key_stats = QueryKeyStats()
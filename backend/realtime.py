@@ -0,0 +1,163 @@
+"""
+Realtime Events
+Per-user server-sent event fan-out with bounded per-connection buffers and Last-Event-ID resume
+"""
+
+import os
+import json
+import asyncio
+import logging
+import secrets
+from collections import OrderedDict, deque
+from typing import AsyncIterator, List, Dict, Optional, Any
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class Subscription:
+    def __init__(self, user_id: str, buffer_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self.dropped = 0
+        # True when a reconnect was fully caught up from history (no fresh snapshot needed)
+        self.resumed = False
+        self.overflowed = False
+
+    def push(self, event: tuple):
+        """
+        Never block the publisher. Deltas are additive, so a client can't skip one: when a slow client's
+        buffer overflows, its buffered events are dropped and the stream ends with a "resync" event; the
+        client reconnects with Last-Event-ID and is replayed from history or sent a fresh snapshot
+        """
+        if self.overflowed:
+            self.dropped += 1
+            return
+        if self.queue.full():
+            self.dropped += self.queue.qsize() + 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.overflowed = True
+            self.queue.put_nowait(None)
+            return
+        self.queue.put_nowait(event)
+
+class UserEventBroker:
+    def __init__(self, history_size: int = 100, buffer_size: int = 50, heartbeat_seconds: float = 15.0,
+                 max_history_users: int = 10000):
+        self.history_size = history_size
+        self.max_history_users = max_history_users
+        self.buffer_size = buffer_size
+        self.heartbeat_seconds = heartbeat_seconds
+        # Event IDs are "<boot>-<n>": n is a per-process counter, so an ID is only meaningful to the
+        # process that issued it (not after a restart, nor on another worker)
+        self.boot_id = secrets.token_hex(6)
+        self._last_id = 0
+        self._subscribers: Dict[str, List[Subscription]] = {}
+        # user_id -> recent (event_id, event_type, data) for resuming after a reconnect
+        self._history: "OrderedDict[str, deque]" = OrderedDict()
+        # user_id -> newest event ID that has fallen out of that user's history
+        self._evicted_upto: Dict[str, int] = {}
+        self.resumes = 0
+        self.resumes_refused = 0
+        self.overflows = 0
+
+    def publish(self, user_id: str, event_type: str, data: Dict[str, Any]) -> int:
+        self._last_id += 1
+        event = (self._last_id, event_type, data)
+        history = self._history.get(user_id)
+        if history is None:
+            history = self._history[user_id] = deque(maxlen=self.history_size)
+        if len(history) == self.history_size:
+            self._evicted_upto[user_id] = history[0][0]
+        history.append(event)
+        self._history.move_to_end(user_id)
+        while len(self._history) > self.max_history_users:
+            evicted_user, _ = self._history.popitem(last=False)
+            self._evicted_upto.pop(evicted_user, None)
+        for subscription in self._subscribers.get(user_id, []):
+            subscription.push(event)
+        return event[0]
+
+    def _parse_event_id(self, event_id: Optional[str]) -> Optional[int]:
+        """
+        The counter part of an event ID this process issued, or None for anything else
+        """
+        boot_id, _, number = (event_id or "").partition("-")
+        if boot_id != self.boot_id or not number.isdigit():
+            return None
+        number = int(number)
+        return number if number <= self._last_id else None
+
+    def subscribe(self, user_id: str, last_event_id: Optional[str] = None) -> Subscription:
+        """
+        Register a connection; events after last_event_id still in history are replayed first
+        If the client can't be resumed (too far behind, no history for the user, or an ID issued by
+        another process), subscription.resumed stays False and the caller should send a fresh snapshot
+        """
+        subscription = Subscription(user_id, self.buffer_size)
+        resume_from = self._parse_event_id(last_event_id)
+        history = self._history.get(user_id)
+        if resume_from is not None and history is not None and resume_from >= self._evicted_upto.get(user_id, 0):
+            missed = [event for event in history if event[0] > resume_from]
+            if len(missed) <= self.buffer_size:
+                for event in missed:
+                    subscription.push(event)
+                subscription.resumed = True
+        if last_event_id is not None:
+            if subscription.resumed:
+                self.resumes += 1
+            else:
+                self.resumes_refused += 1
+        self._subscribers.setdefault(user_id, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.user_id, [])
+        if subscription in subscribers:
+            subscribers.remove(subscription)
+        if not subscribers:
+            self._subscribers.pop(subscription.user_id, None)
+
+    async def stream(self, subscription: Subscription, initial: Optional[tuple] = None) -> AsyncIterator[str]:
+        """
+        Render a subscription as text/event-stream chunks, with heartbeat comments while idle
+        """
+        try:
+            yield "retry: 3000\n\n"
+            if initial is not None:
+                yield self.format_event(*initial)
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if event is None:
+                    yield self.format_event(None, "resync", {"reason": "buffer_overflow"})
+                    self.overflows += 1
+                    return
+                yield self.format_event(*event)
+        finally:
+            self.unsubscribe(subscription)
+
+    def format_event(self, event_id: Optional[int], event_type: str, data: Dict[str, Any]) -> str:
+        id_line = f"id: {self.boot_id}-{event_id}\n" if event_id is not None else ""
+        return f"{id_line}event: {event_type}\ndata: {json.dumps(data, default=str, separators=(',', ':'))}\n\n"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "users": len(self._subscribers),
+            "connections": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "dropped_events": sum(
+                subscription.dropped for subscribers in self._subscribers.values() for subscription in subscribers
+            ),
+            "resumes": self.resumes,
+            "resumes_refused": self.resumes_refused,
+            "overflows": self.overflows
+        }
+
+# Global instance
+event_broker = UserEventBroker(
+    buffer_size=int(os.getenv('SSE_BUFFER_SIZE', '50')),
+    heartbeat_seconds=float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+)
@@ -0,0 +1,163 @@
+"""
+Recent Foods
+Per-user index of recently and frequently logged foods, so repeat logs are suggested without a Passio search
+"""
+
+import os
+import time
+import logging
+from datetime import datetime, timezone
+from typing import List, Dict, Optional, Any
+
+from shared_cache import shared_cache, TieredCache
+from passio_service import stable_food_id
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Compact index row layout (JSON-friendly for the shared cache tier)
+NAME, CARBS, FAT, PROTEIN, FREQUENCY, LAST_LOGGED, LAST_PORTION = range(7)
+
+def _food_key(name: str) -> str:
+    return " ".join(name.lower().split())
+
+def _entry_epoch(timestamp: Any) -> float:
+    if isinstance(timestamp, datetime):
+        parsed = timestamp
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(timestamp).replace('Z', '+00:00'))
+        except ValueError:
+            return time.time()
+    if parsed.tzinfo is None:
+        # Entries are stamped with naive UTC times
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+class RecentFoodsIndex:
+    def __init__(self, half_life_days: float = 14.0, max_foods_per_user: int = 150, ttl_seconds: float = 3600.0):
+        self.half_life = half_life_days * 86400
+        self.max_foods_per_user = max_foods_per_user
+        # user_id -> {food key: compact row}
+        self._cache = TieredCache("recent_foods", maxsize=5000, ttl_seconds=ttl_seconds, shared=shared_cache)
+        self.builds = 0
+
+    def _decay(self, frequency: float, since: float, now: float) -> float:
+        return frequency * 0.5 ** (max(0.0, now - since) / self.half_life)
+
+    def _add(self, index: Dict[str, list], entry: Dict[str, Any]):
+        name = (entry.get("name") or "").strip()
+        if not name:
+            return
+        logged_at = _entry_epoch(entry.get("timestamp"))
+        key = _food_key(name)
+        row = index.get(key)
+        if row is None:
+            index[key] = [
+                name,
+                entry.get("carbs_per_100g") or 0.0,
+                entry.get("fat_per_100g") or 0.0,
+                entry.get("protein_per_100g") or 0.0,
+                1.0,
+                logged_at,
+                entry.get("portion_size")
+            ]
+            return
+        # Frequency decays with a half-life, so old habits fade and each log adds one
+        if logged_at >= row[LAST_LOGGED]:
+            row[FREQUENCY] = self._decay(row[FREQUENCY], row[LAST_LOGGED], logged_at) + 1.0
+            row[NAME] = name
+            row[CARBS] = entry.get("carbs_per_100g") or row[CARBS]
+            row[FAT] = entry.get("fat_per_100g") or row[FAT]
+            row[PROTEIN] = entry.get("protein_per_100g") or row[PROTEIN]
+            row[LAST_LOGGED] = logged_at
+            row[LAST_PORTION] = entry.get("portion_size") or row[LAST_PORTION]
+        else:
+            row[FREQUENCY] += self._decay(1.0, logged_at, row[LAST_LOGGED])
+
+    def _trim(self, index: Dict[str, list]) -> Dict[str, list]:
+        if len(index) <= self.max_foods_per_user:
+            return index
+        now = time.time()
+        keep = sorted(index.items(), key=lambda item: self.score(item[1], now), reverse=True)
+        return dict(keep[:self.max_foods_per_user])
+
+    def score(self, row: list, now: float) -> float:
+        return self._decay(row[FREQUENCY], row[LAST_LOGGED], now)
+
+    def get(self, user_id: str) -> Optional[Dict[str, list]]:
+        return self._cache.get(user_id)
+
+    def build(self, user_id: str, rows: List[Dict[str, Any]]) -> Dict[str, list]:
+        """
+        Rebuild a user's index from their food_entries rows
+        """
+        index: Dict[str, list] = {}
+        for row in sorted(rows, key=lambda row: str(row.get("timestamp", ""))):
+            self._add(index, row)
+        index = self._trim(index)
+        self._cache.replace(user_id, index)
+        self.builds += 1
+        return index
+
+    def record(self, user_id: str, entry: Dict[str, Any]):
+        """
+        Fold a newly logged entry into the user's index, if it has been built
+        """
+        index = self._cache.get(user_id)
+        if index is None:
+            return
+        index = dict(index)
+        key = _food_key(entry.get("name") or "")
+        if key in index:
+            index[key] = list(index[key])
+        self._add(index, entry)
+        self._cache.replace(user_id, self._trim(index))
+
+    def invalidate(self, user_id: str):
+        self._cache.invalidate(user_id)
+
+    def suggest(self, index: Dict[str, list], query: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Foods from the index matching query (prefix of any word, or substring), best score first
+        """
+        now = time.time()
+        needle = _food_key(query) if query else ""
+        matches = []
+        for key, row in index.items():
+            if needle:
+                if key.startswith(needle) or any(word.startswith(needle) for word in key.split()):
+                    boost = 2.0 if key == needle else 1.0
+                elif needle in key:
+                    boost = 0.5
+                else:
+                    continue
+            else:
+                boost = 1.0
+            matches.append((self.score(row, now) * boost, row))
+        matches.sort(key=lambda match: match[0], reverse=True)
+        return [self._to_result(row, score) for score, row in matches[:limit]]
+
+    def _to_result(self, row: list, score: float) -> Dict[str, Any]:
+        return {
+            "id": stable_food_id(row[NAME], source="recent"),
+            "name": row[NAME],
+            "brand": None,
+            "carbs_per_100g": row[CARBS],
+            "fat_per_100g": row[FAT],
+            "protein_per_100g": row[PROTEIN],
+            "category": "Recent",
+            "last_portion_size": row[LAST_PORTION],
+            "last_logged_at": datetime.fromtimestamp(row[LAST_LOGGED], tz=timezone.utc).isoformat(),
+            "score": round(score, 3),
+            "confidence": 1.0
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {"builds": self.builds, **self._cache.stats()}
+
+# Global instance
+recent_foods = RecentFoodsIndex(
+    half_life_days=float(os.getenv('RECENT_FOODS_HALF_LIFE_DAYS', '14')),
+    max_foods_per_user=int(os.getenv('RECENT_FOODS_PER_USER', '150'))
+)
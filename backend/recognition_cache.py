@@ -0,0 +1,83 @@
+"""
+Recognition Cache
+Per-user cache of image recognition results keyed by perceptual hash, so near-identical photos reuse earlier results
+"""
+
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import List, Dict, Optional, Any
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+class RecognitionCache:
+    def __init__(self, ttl_seconds: float = 600.0, max_distance: int = 6,
+                 max_entries_per_user: int = 32, max_users: int = 5000):
+        self.ttl = ttl_seconds
+        self.max_distance = max_distance
+        self.max_entries_per_user = max_entries_per_user
+        self.max_users = max_users
+        # user_id -> list of (fingerprint, expires_at, results), newest last
+        self._entries: "OrderedDict[str, List[tuple]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str, fingerprint: Optional[int]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return results for the closest cached image within max_distance, if any
+        """
+        if fingerprint is None:
+            return None
+
+        entries = self._entries.get(user_id)
+        if entries:
+            now = time.monotonic()
+            entries[:] = [entry for entry in entries if entry[1] > now]
+            best = None
+            best_distance = self.max_distance + 1
+            for cached_fingerprint, _, results in entries:
+                distance = hamming_distance(fingerprint, cached_fingerprint)
+                if distance < best_distance:
+                    best, best_distance = results, distance
+            if best is not None:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                logger.debug("Recognition cache hit for user %s (distance %d)", user_id, best_distance)
+                return best
+
+        self.misses += 1
+        return None
+
+    def put(self, user_id: str, fingerprint: Optional[int], results: List[Dict[str, Any]]):
+        if fingerprint is None or not results:
+            return
+        entries = self._entries.setdefault(user_id, [])
+        self._entries.move_to_end(user_id)
+        entries.append((fingerprint, time.monotonic() + self.ttl, results))
+        if len(entries) > self.max_entries_per_user:
+            del entries[0]
+        while len(self._entries) > self.max_users:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "users": len(self._entries),
+            "entries": sum(len(entries) for entries in self._entries.values()),
+            "max_distance": self.max_distance,
+            "ttl_seconds": self.ttl
+        }
+
+# Global instance
+recognition_cache = RecognitionCache(
+    ttl_seconds=float(os.getenv('RECOGNITION_CACHE_TTL_SECONDS', '600')),
+    max_distance=int(os.getenv('RECOGNITION_CACHE_MAX_DISTANCE', '6'))
+)
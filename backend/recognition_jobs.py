@@ -0,0 +1,209 @@
+"""
+Recognition Jobs
+Runs image recognition in the background on a bounded worker pool; clients poll or stream results
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+import contextvars
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Dict, Optional, Any
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+class JobLimitExceeded(Exception):
+    pass
+
+class JobQueueFull(Exception):
+    """
+    The server-wide bound on queued jobs or the image bytes they hold was reached
+    """
+    pass
+
+class RecognitionJob:
+    def __init__(self, user_id: str, image_count: int):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.status = JOB_PENDING
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        # One slot per submitted image, filled in as each finishes
+        self.items: List[Dict[str, Any]] = [{"index": i, "status": JOB_PENDING} for i in range(image_count)]
+        # Set (and replaced) whenever the job changes, so SSE streams can wait for updates
+        self.changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JOB_COMPLETED, JOB_FAILED)
+
+    def notify(self):
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "completed": sum(1 for item in self.items if item["status"] in (JOB_COMPLETED, JOB_FAILED)),
+            "total": len(self.items),
+            "items": self.items
+        }
+
+class RecognitionJobManager:
+    def __init__(self, max_workers: int = 4, max_jobs_per_user: int = 2, max_images_per_job: int = 5,
+                 result_ttl_seconds: float = 600.0, max_jobs: int = 1000, max_active_jobs: int = 100,
+                 max_active_bytes: int = 200 * 1024 * 1024):
+        self.max_workers = max_workers
+        # Server-wide bounds on unfinished jobs and the decoded images they keep in memory
+        self.max_active_jobs = max_active_jobs
+        self.max_active_bytes = max_active_bytes
+        self.max_jobs_per_user = max_jobs_per_user
+        self.max_images_per_job = max_images_per_job
+        self.result_ttl = result_ttl_seconds
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, RecognitionJob]" = OrderedDict()
+        self._active_by_user: Dict[str, int] = {}
+        self._active_jobs = 0
+        self._active_bytes = 0
+        self.rejected_full = 0
+        self._workers: Optional[asyncio.Semaphore] = None
+        self._tasks: set = set()
+        self._cleanup_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._workers = asyncio.Semaphore(self.max_workers)
+        self._cleanup_task = asyncio.get_running_loop().create_task(self._cleanup_loop())
+
+    async def stop(self):
+        tasks = list(self._tasks)
+        if self._cleanup_task is not None:
+            tasks.append(self._cleanup_task)
+            self._cleanup_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def submit(self, user_id: str, images: List[bytes],
+               recognize: Callable[[bytes], Awaitable[Dict[str, Any]]]) -> RecognitionJob:
+        """
+        Queue a job of one or more images; `recognize` runs once per image on the worker pool
+        """
+        if not images:
+            raise ValueError("At least one image is required")
+        if len(images) > self.max_images_per_job:
+            raise ValueError(f"A job can contain at most {self.max_images_per_job} images")
+        if self._active_by_user.get(user_id, 0) >= self.max_jobs_per_user:
+            raise JobLimitExceeded(f"At most {self.max_jobs_per_user} recognition jobs can run at once")
+        image_bytes = sum(len(image) for image in images)
+        if self._active_jobs >= self.max_active_jobs or self._active_bytes + image_bytes > self.max_active_bytes:
+            self.rejected_full += 1
+            raise JobQueueFull("Too many recognition jobs are queued, try again shortly")
+        if self._workers is None:
+            self._workers = asyncio.Semaphore(self.max_workers)
+
+        job = RecognitionJob(user_id, len(images))
+        self._jobs[job.id] = job
+        if len(self._jobs) > self.max_jobs:
+            # Only finished jobs are evicted: a queued or running job must stay pollable
+            finished = [job_id for job_id, existing in self._jobs.items() if existing.done]
+            for job_id in finished[:len(self._jobs) - self.max_jobs]:
+                del self._jobs[job_id]
+        self._active_by_user[user_id] = self._active_by_user.get(user_id, 0) + 1
+        self._active_jobs += 1
+        self._active_bytes += image_bytes
+
+        # A fresh context: the job outlives the submitting request's metrics and trace span
+        task = contextvars.Context().run(
+            asyncio.get_running_loop().create_task, self._run(job, images, recognize, image_bytes)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str, user_id: str) -> Optional[RecognitionJob]:
+        job = self._jobs.get(job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        return job
+
+    async def _run(self, job: RecognitionJob, images: List[bytes], recognize, image_bytes: int = 0):
+        try:
+            job.status = JOB_RUNNING
+            job.notify()
+            await asyncio.gather(*(self._run_item(job, index, image, recognize) for index, image in enumerate(images)))
+            failed = all(item["status"] == JOB_FAILED for item in job.items)
+            job.status = JOB_FAILED if failed else JOB_COMPLETED
+        except asyncio.CancelledError:
+            job.status = JOB_FAILED
+            raise
+        finally:
+            job.finished_at = time.time()
+            self._active_jobs -= 1
+            self._active_bytes -= image_bytes
+            remaining = self._active_by_user.get(job.user_id, 1) - 1
+            if remaining > 0:
+                self._active_by_user[job.user_id] = remaining
+            else:
+                self._active_by_user.pop(job.user_id, None)
+            job.notify()
+
+    async def _run_item(self, job: RecognitionJob, index: int, image: bytes, recognize):
+        item = job.items[index]
+        async with self._workers:
+            item["status"] = JOB_RUNNING
+            job.notify()
+            try:
+                item.update(await recognize(image))
+                item["status"] = JOB_COMPLETED
+            except Exception as e:
+                logger.warning("Recognition job %s item %d failed: %s", job.id, index, e)
+                item["status"] = JOB_FAILED
+                item["error"] = str(e) if isinstance(e, ValueError) else "Recognition failed"
+        job.notify()
+
+    async def _cleanup_loop(self):
+        while True:
+            await asyncio.sleep(60)
+            self.cleanup()
+
+    def cleanup(self):
+        """
+        Drop finished jobs whose results have outlived the TTL
+        """
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.done and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+        if expired:
+            logger.debug("Removed %d expired recognition jobs", len(expired))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "jobs": len(self._jobs),
+            "running_tasks": len(self._tasks),
+            "active_users": len(self._active_by_user),
+            "active_jobs": self._active_jobs,
+            "active_bytes": self._active_bytes,
+            "rejected_full": self.rejected_full,
+            "max_workers": self.max_workers
+        }
+
+# Global instance
+recognition_jobs = RecognitionJobManager(
+    max_workers=int(os.getenv('RECOGNITION_JOB_WORKERS', '4')),
+    max_jobs_per_user=int(os.getenv('RECOGNITION_JOBS_PER_USER', '2')),
+    result_ttl_seconds=float(os.getenv('RECOGNITION_JOB_TTL_SECONDS', '600')),
+    max_active_jobs=int(os.getenv('RECOGNITION_JOBS_MAX_ACTIVE', '100')),
+    max_active_bytes=int(os.getenv('RECOGNITION_JOBS_MAX_ACTIVE_MB', '200')) * 1024 * 1024
+)
@@ -0,0 +1,82 @@
+"""
+Request Metrics
+Counts and times upstream calls (Supabase, Passio, OpenAI) made while serving a request
+"""
+
+import time
+import logging
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class RequestMetrics:
+    """
+    Upstream call counters for a single request
+    """
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        # kind -> {"count": int, "duration_ms": float}
+        self.calls: Dict[str, Dict[str, float]] = {}
+
+    def record(self, kind: str, duration_ms: float):
+        entry = self.calls.setdefault(kind, {"count": 0, "duration_ms": 0.0})
+        entry["count"] += 1
+        entry["duration_ms"] += duration_ms
+
+    def count(self, kind: str) -> int:
+        return int(self.calls.get(kind, {}).get("count", 0))
+
+    @property
+    def round_trips(self) -> int:
+        """
+        Total number of upstream calls made so far
+        """
+        return sum(int(entry["count"]) for entry in self.calls.values())
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started_at) * 1000
+
+    def server_timing_header(self) -> str:
+        """
+        Render the breakdown as a Server-Timing header value
+        """
+        parts = []
+        for kind, entry in sorted(self.calls.items()):
+            parts.append(f'{kind};dur={entry["duration_ms"]:.1f};desc="{int(entry["count"])} calls"')
+        parts.append(f"total;dur={self.elapsed_ms:.1f}")
+        return ", ".join(parts)
+
+_current_metrics: contextvars.ContextVar[Optional[RequestMetrics]] = contextvars.ContextVar(
+    "request_metrics", default=None
+)
+
+def begin_request():
+    """
+    Start collecting metrics for the current request
+    Returns the metrics object and the context token needed by end_request
+    """
+    metrics = RequestMetrics()
+    return metrics, _current_metrics.set(metrics)
+
+def end_request(token):
+    _current_metrics.reset(token)
+
+def current_metrics() -> Optional[RequestMetrics]:
+    return _current_metrics.get()
+
+@contextmanager
+def track_call(kind: str):
+    """
+    Time an upstream call and record it against the current request (no-op outside a request)
+    """
+    metrics = _current_metrics.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.record(kind, (time.perf_counter() - start) * 1000)
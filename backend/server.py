@@ -1,8 +1,9 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, Header, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.formparsers import MultiPartParser, MultiPartException
 import os
 import logging
 import json
@@ -17,9 +18,31 @@ from passlib.context import CryptContext
 from supabase import create_client, Client
 import openai
 import base64
+import time
 
 # Import Passio service
-from passio_service import passio_service
+from passio_service import passio_service, is_synthetic_food_id
+from request_metrics import begin_request, end_request, track_call
+from loop_monitor import loop_monitor
+from profiling import sampling_profiler, memory_snapshots
+from tracing import tracer, SPAN_KIND_SERVER, SPAN_KIND_CLIENT
+from logging_config import configure_logging, request_id_var, dropped_records
+from image_pipeline import image_pipeline, ImageValidationError
+from recognition_cache import recognition_cache
+from recognition_jobs import recognition_jobs, JobLimitExceeded, JobQueueFull
+from delta_sync import decode_sync_token, build_sync_page, InvalidSyncToken
+from realtime import event_broker
+from entry_journal import entry_journal
+from food_catalog import food_catalog
+from food_search import federated_search, _dedupe_key
+from typeahead import typeahead
+from query_normalizer import canonicalize_query, query_key_stats
+from details_prefetch import details_prefetcher
+from nutrient_estimator import nutrient_estimator
+from popular_foods import popular_foods
+from recent_foods import recent_foods
+from shared_cache import shared_cache, TieredCache
+from idempotency import idempotency_store, request_fingerprint, IdempotencyConflict
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
@@ -33,6 +56,25 @@ PASSIO_API_KEY = os.getenv('PASSIO_API_KEY')
 JWT_SECRET = os.getenv('JWT_SECRET', 'sugardrop-secret-key-change-in-production')
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = 24
+APP_ENV = os.getenv('APP_ENV', 'production')
+LOOP_MONITOR_ENABLED = os.getenv('LOOP_MONITOR_ENABLED', 'true').lower() == 'true'
+# Comma-separated emails allowed to use /api/admin endpoints
+ADMIN_EMAILS = {email.strip().lower() for email in os.getenv('ADMIN_EMAILS', '').split(',') if email.strip()}
+MAX_PROFILE_SECONDS = 60
+# Maximum upstream calls (Supabase + Passio + OpenAI) a single request may make
+ROUND_TRIP_BUDGET = int(os.getenv('ROUND_TRIP_BUDGET', '4'))
+# Concurrent Passio detail lookups allowed per plate recognition
+PLATE_DETAILS_CONCURRENCY = int(os.getenv('PLATE_DETAILS_CONCURRENCY', '3'))
+SYNC_MAX_PAGE_SIZE = 500
+# Longer than any write transaction: the sync cursor only moves past changes at least this old
+SYNC_SETTLE_SECONDS = float(os.getenv('SYNC_SETTLE_SECONDS', '5'))
+# How far back the recent/frequent foods index looks when it is (re)built
+RECENT_FOODS_LOOKBACK_DAYS = int(os.getenv('RECENT_FOODS_LOOKBACK_DAYS', '90'))
+# One deadline for all federated search sources (recent foods, local catalog, Passio)
+SEARCH_DEADLINE_SECONDS = float(os.getenv('SEARCH_DEADLINE_SECONDS', '2.5'))
+POPULAR_FOODS_MAX_AGE_SECONDS = int(os.getenv('POPULAR_FOODS_MAX_AGE_SECONDS', '300'))
+# Seconds an authenticated user's row may be served from cache; profile writes invalidate it on every worker
+USER_CACHE_TTL_SECONDS = float(os.getenv('USER_CACHE_TTL_SECONDS', '60'))
 
 # Initialize Supabase client
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
@@ -46,6 +88,9 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # JWT Security
 security = HTTPBearer()
 
+# users rows by id, without the password hash
+user_row_cache = TieredCache("users", maxsize=5000, ttl_seconds=USER_CACHE_TTL_SECONDS, shared=shared_cache)
+
 # FastAPI app setup
 app = FastAPI(title="SugarDrop API with Passio + Supabase", version="2.1.0")
 api_router = APIRouter(prefix="/api")
@@ -139,10 +184,20 @@ class KBQuery(BaseModel):
 class FoodSearchQuery(BaseModel):
     query: str
     limit: Optional[int] = 20
+    # Later pages (offset > 0) come from Passio only
+    offset: Optional[int] = 0
 
 class ImageRecognitionRequest(BaseModel):
     image_base64: str
 
+class PlateRecognitionRequest(BaseModel):
+    image_base64: str
+    meal_type: Optional[str] = "snack"
+    min_confidence: Optional[float] = 0.0
+
+class RecognitionJobRequest(BaseModel):
+    images_base64: List[str]
+
 class BarcodeRequest(BaseModel):
     barcode: str
 
@@ -218,6 +273,20 @@ def extract_nutrition_values(passio_item: dict) -> dict:
     }
 
 # Utility functions
+def execute_query(query):
+    """
+    Execute a Supabase query, counting it against the current request's round-trip budget
+    """
+    attributes = {
+        "db.system": "postgresql",
+        "db.table": getattr(query, "path", None),
+        "db.operation": getattr(query, "http_method", None)
+    }
+    with tracer.start_span("supabase.execute", attributes, kind=SPAN_KIND_CLIENT), track_call("supabase"):
+        result = query.execute()
+        tracer.set_attribute("db.rows", len(result.data or []))
+        return result
+
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
@@ -230,7 +299,23 @@ def create_access_token(data: dict):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def get_current_user_row(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """
+    Authenticate the request and return the full users row (fetched once per request)
+    """
+    with tracer.start_span("get_current_user"):
+        return _load_user_row(credentials)
+
+async def get_current_user(user_data: dict = Depends(get_current_user_row)) -> User:
+    return User(
+        id=user_data["id"],
+        email=user_data["email"],
+        name=user_data["name"],
+        daily_sugar_goal=user_data["daily_sugar_goal"],
+        created_at=datetime.fromisoformat(user_data["created_at"].replace('Z', '+00:00'))
+    )
+
+def _load_user_row(credentials: HTTPAuthorizationCredentials) -> dict:
     try:
         token = credentials.credentials
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
@@ -238,22 +323,26 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
         
+        cached = user_row_cache.get(user_id)
+        if cached is not None:
+            return cached
+        
         # Get user from Supabase
-        result = supabase.table('users').select('*').eq('id', user_id).execute()
+        result = execute_query(supabase.table('users').select('*').eq('id', user_id))
         if not result.data:
             raise HTTPException(status_code=401, detail="User not found")
         
-        user_data = result.data[0]
-        return User(
-            id=user_data["id"],
-            email=user_data["email"],
-            name=user_data["name"],
-            daily_sugar_goal=user_data["daily_sugar_goal"],
-            created_at=datetime.fromisoformat(user_data["created_at"].replace('Z', '+00:00'))
-        )
+        user_row = {key: value for key, value in result.data[0].items() if key != "password"}
+        user_row_cache.set(user_id, user_row)
+        return user_row
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+async def get_admin_user(current_user: User = Depends(get_current_user)):
+    if current_user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
 # Body Type Quiz Engine
 def calculate_body_type_from_quiz(responses: List[QuizResponse]) -> QuizResult:
     """
@@ -323,8 +412,8 @@ def calculate_body_type_from_quiz(responses: List[QuizResponse]) -> QuizResult:
             ]
     
     # Log results for telemetry
-    logger.info(f"Body type quiz completed: {body_type}, range: {sugarpoints_range}, counts: {counts}")
-    logger.debug(f"Quiz score breakdown: A={counts['A']}, B={counts['B']}, C={counts['C']}")
+    logger.info("Body type quiz completed: %s, range: %s, counts: %s", body_type, sugarpoints_range, counts)
+    logger.debug("Quiz score breakdown: A=%s, B=%s, C=%s", counts['A'], counts['B'], counts['C'])
     
     return QuizResult(
         body_type=body_type,
@@ -336,11 +425,37 @@ def calculate_body_type_from_quiz(responses: List[QuizResponse]) -> QuizResult:
     )
 
 # Quiz routes
+async def run_idempotent(scope: str, user_id: str, idempotency_key: Optional[str], payload: dict,
+                         handler, response: Response):
+    """
+    Run a write handler at most once per Idempotency-Key; retries get the stored response back
+    """
+    try:
+        result, replayed = await idempotency_store.run(
+            scope, user_id, idempotency_key, request_fingerprint(payload), handler
+        )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
 @api_router.post("/quiz/submit", response_model=QuizResult)
-async def submit_body_type_quiz(quiz_data: QuizSubmission, current_user: User = Depends(get_current_user)):
+async def submit_body_type_quiz(quiz_data: QuizSubmission, response: Response,
+                                idempotency_key: Optional[str] = Header(None),
+                                current_user: User = Depends(get_current_user)):
     """
     Submit body type quiz and get personalized results
+    Safe to retry with the same Idempotency-Key header
     """
+    return await run_idempotent(
+        "quiz.submit", current_user.id, idempotency_key, quiz_data.dict(),
+        lambda: _submit_quiz(quiz_data, current_user), response
+    )
+
+async def _submit_quiz(quiz_data: QuizSubmission, current_user: User) -> QuizResult:
     try:
         # Validate quiz submission
         if len(quiz_data.responses) != 15:
@@ -370,14 +485,15 @@ async def submit_body_type_quiz(quiz_data: QuizSubmission, current_user: User =
                 "quiz_completed_at": datetime.utcnow().isoformat()
             }
             
-            supabase.table('users').update(update_data).eq('id', current_user.id).execute()
-            logger.info(f"Quiz results stored for user {current_user.id}")
+            execute_query(supabase.table('users').update(update_data).eq('id', current_user.id))
+            user_row_cache.invalidate(current_user.id)
+            logger.info("Quiz results stored for user %s", current_user.id)
         except Exception as storage_error:
             # Log the storage error but don't fail the quiz
-            logger.warning(f"Could not store quiz results (schema may need update): {str(storage_error)}")
+            logger.warning("Could not store quiz results (schema may need update): %s", storage_error)
         
         # Log telemetry
-        logger.info(f"User {current_user.id} completed body type quiz: {result.body_type}")
+        logger.info("User %s completed body type quiz: %s", current_user.id, result.body_type)
         
         return result
         
@@ -385,13 +501,13 @@ async def submit_body_type_quiz(quiz_data: QuizSubmission, current_user: User =
         raise
     except ValueError as e:
         # Handle validation errors from quiz engine
-        logger.error(f"Quiz validation error: {str(e)}")
+        logger.error("Quiz validation error: %s", e)
         raise HTTPException(
             status_code=400, 
             detail=str(e)
         )
     except Exception as e:
-        logger.error(f"Quiz submission error: {str(e)}")
+        logger.error("Quiz submission error: %s", e)
         raise HTTPException(
             status_code=500, 
             detail="We had trouble processing your quiz. Try again shortly."
@@ -421,7 +537,8 @@ async def update_user_profile(profile_data: UserProfileUpdate, current_user: Use
             update_fields['completed_onboarding'] = profile_data.completed_onboarding
         
         # Update user in Supabase
-        result = supabase.table('users').update(update_fields).eq('id', current_user.id).execute()
+        result = execute_query(supabase.table('users').update(update_fields).eq('id', current_user.id))
+        user_row_cache.invalidate(current_user.id)
         
         if not result.data:
             raise HTTPException(status_code=500, detail="Failed to update user profile")
@@ -445,44 +562,42 @@ async def update_user_profile(profile_data: UserProfileUpdate, current_user: Use
         }
         
     except Exception as e:
-        logger.error(f"Error updating user profile: {str(e)}")
+        logger.error("Error updating user profile: %s", e)
         raise HTTPException(status_code=500, detail="Failed to update profile")
 
+def format_user_profile(user_data: dict) -> dict:
+    return {
+        "id": user_data["id"],
+        "email": user_data["email"],
+        "name": user_data["name"],
+        "daily_sugar_goal": user_data.get("daily_sugar_goal", 50.0),
+        "daily_sugar_points_target": user_data.get("daily_sugar_points_target", 100),
+        "age": user_data.get("age"),
+        "gender": user_data.get("gender"),
+        "activity_level": user_data.get("activity_level"),
+        "health_goals": user_data.get("health_goals", []),
+        "completed_onboarding": user_data.get("completed_onboarding", False),
+        "created_at": user_data["created_at"],
+    }
+
 @api_router.get("/user/profile")
-async def get_user_profile(current_user: User = Depends(get_current_user)):
+async def get_user_profile(user_data: dict = Depends(get_current_user_row)):
     """
     Get complete user profile including onboarding data
     """
     try:
-        result = supabase.table('users').select('*').eq('id', current_user.id).execute()
-        
-        if not result.data:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        user_data = result.data[0]
-        return {
-            "id": user_data["id"],
-            "email": user_data["email"],
-            "name": user_data["name"],
-            "daily_sugar_goal": user_data.get("daily_sugar_goal", 50.0),
-            "daily_sugar_points_target": user_data.get("daily_sugar_points_target", 100),
-            "age": user_data.get("age"),
-            "gender": user_data.get("gender"),
-            "activity_level": user_data.get("activity_level"),
-            "health_goals": user_data.get("health_goals", []),
-            "completed_onboarding": user_data.get("completed_onboarding", False),
-            "created_at": user_data["created_at"],
-        }
+        # The auth dependency already loaded the full row, no second lookup needed
+        return format_user_profile(user_data)
         
     except Exception as e:
-        logger.error(f"Error fetching user profile: {str(e)}")
+        logger.error("Error fetching user profile: %s", e)
         raise HTTPException(status_code=500, detail="Failed to fetch profile")
 
 # Auth routes
 @api_router.post("/auth/register", response_model=Token)
 async def register(user_data: UserCreate):
     # Check if user exists
-    existing_user = supabase.table('users').select('*').eq('email', user_data.email).execute()
+    existing_user = execute_query(supabase.table('users').select('*').eq('email', user_data.email))
     if existing_user.data:
         raise HTTPException(status_code=400, detail="Email already registered")
     
@@ -500,7 +615,7 @@ async def register(user_data: UserCreate):
     }
     
     # Insert user into Supabase
-    result = supabase.table('users').insert(user_doc).execute()
+    result = execute_query(supabase.table('users').insert(user_doc))
     if not result.data:
         raise HTTPException(status_code=500, detail="Failed to create user")
     
@@ -519,7 +634,7 @@ async def register(user_data: UserCreate):
 @api_router.post("/auth/login", response_model=Token)
 async def login(user_data: UserLogin):
     # Find user
-    result = supabase.table('users').select('*').eq('email', user_data.email).execute()
+    result = execute_query(supabase.table('users').select('*').eq('email', user_data.email))
     if not result.data or not verify_password(user_data.password, result.data[0]["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
@@ -539,7 +654,19 @@ async def login(user_data: UserLogin):
 
 # Food tracking routes with SugarPoints system
 @api_router.post("/food/entries", response_model=FoodEntry)
-async def create_food_entry(entry_data: FoodEntryCreate, current_user: User = Depends(get_current_user)):
+async def create_food_entry(entry_data: FoodEntryCreate, response: Response,
+                            idempotency_key: Optional[str] = Header(None),
+                            current_user: User = Depends(get_current_user)):
+    """
+    Log a food entry; retries with the same Idempotency-Key header return the original entry
+    instead of inserting a duplicate
+    """
+    return await run_idempotent(
+        "food_entries.create", current_user.id, idempotency_key, entry_data.dict(),
+        lambda: _insert_food_entry(entry_data, current_user), response
+    )
+
+async def _insert_food_entry(entry_data: FoodEntryCreate, current_user: User) -> FoodEntry:
     # Handle backward compatibility - convert sugar_content to carbs_per_100g if needed
     carbs_per_100g = entry_data.carbs_per_100g
     if carbs_per_100g is None and entry_data.sugar_content is not None:
@@ -571,56 +698,134 @@ async def create_food_entry(entry_data: FoodEntryCreate, current_user: User = De
     entry_dict = entry.dict()
     entry_dict['timestamp'] = entry_dict['timestamp'].isoformat()
     
+    if entry_journal.enabled:
+        # Write-behind: acknowledge once durably journaled; the flusher inserts it into Supabase
+        try:
+            await asyncio.to_thread(entry_journal.append, entry_dict)
+        except Exception as e:
+            logger.error("Entry journal append failed: %s", e)
+            raise HTTPException(status_code=500, detail="Failed to create food entry")
+        entry_added(current_user.id, entry_dict)
+        return entry
+    
     # Try to insert with new fields, with fallback for older schema
     try:
-        result = supabase.table('food_entries').insert(entry_dict).execute()
+        result = execute_query(supabase.table('food_entries').insert(entry_dict))
         if not result.data:
             raise HTTPException(status_code=500, detail="Failed to create food entry")
+        entry_added(current_user.id, entry_dict)
         return entry
     except Exception as e:
         # If new columns don't exist, try with minimal fields
-        if any(field in str(e) for field in ["carbs_per_100g", "fat_per_100g", "protein_per_100g", "sugar_points", "meal_type"]):
-            logger.warning(f"New columns not found in database schema, inserting with basic legacy fields: {str(e)}")
-            # Use only the most basic fields that should exist in any food_entries table
-            basic_entry_dict = {
-                "id": entry_dict["id"],
-                "user_id": entry_dict["user_id"],
-                "name": entry_dict["name"],
-                "sugar_content": entry_dict["sugar_content"],
-                "portion_size": entry_dict["portion_size"],
-                "timestamp": entry_dict["timestamp"]
-            }
-            
-            # Only add calories if it's not None
-            if entry_dict.get("calories") is not None:
-                basic_entry_dict["calories"] = entry_dict["calories"]
-            
-            result = supabase.table('food_entries').insert(basic_entry_dict).execute()
+        if any(field in str(e) for field in NEW_ENTRY_COLUMNS):
+            logger.warning("New columns not found in database schema, inserting with basic legacy fields: %s", e)
+            result = execute_query(supabase.table('food_entries').insert(legacy_entry_fields(entry_dict)))
             if not result.data:
                 raise HTTPException(status_code=500, detail="Failed to create food entry")
             
+            entry_added(current_user.id, entry_dict)
+            
             # Return entry with calculated SugarPoints for API consistency
             return entry
         else:
             raise HTTPException(status_code=500, detail=f"Failed to create food entry: {str(e)}")
 
+NEW_ENTRY_COLUMNS = ["carbs_per_100g", "fat_per_100g", "protein_per_100g", "sugar_points", "meal_type"]
+
+def legacy_entry_fields(entry_dict: dict) -> dict:
+    """
+    Only the most basic fields that should exist in any food_entries table
+    """
+    basic_entry_dict = {
+        "id": entry_dict["id"],
+        "user_id": entry_dict["user_id"],
+        "name": entry_dict["name"],
+        "sugar_content": entry_dict["sugar_content"],
+        "portion_size": entry_dict["portion_size"],
+        "timestamp": entry_dict["timestamp"]
+    }
+    
+    # Only add calories if it's not None
+    if entry_dict.get("calories") is not None:
+        basic_entry_dict["calories"] = entry_dict["calories"]
+    return basic_entry_dict
+
+def insert_journaled_entries(rows: List[dict]):
+    """
+    Bulk write for the entry journal flusher; an upsert on id, so a retried batch can't duplicate rows
+    """
+    try:
+        execute_query(supabase.table('food_entries').upsert(rows))
+    except Exception as e:
+        if not any(field in str(e) for field in NEW_ENTRY_COLUMNS):
+            raise
+        logger.warning("New columns not found in database schema, flushing with basic legacy fields: %s", e)
+        execute_query(supabase.table('food_entries').upsert([legacy_entry_fields(row) for row in rows]))
+
 @api_router.get("/food/entries", response_model=List[FoodEntry])
 async def get_food_entries(current_user: User = Depends(get_current_user)):
-    result = supabase.table('food_entries').select('*').eq('user_id', current_user.id).order('timestamp', desc=True).limit(100).execute()
-    return [FoodEntry(**entry) for entry in result.data]
+    result = execute_query(supabase.table('food_entries').select('*').eq('user_id', current_user.id).order('timestamp', desc=True).limit(100))
+    rows = entry_journal.merge(current_user.id, result.data)
+    if len(rows) > len(result.data):
+        rows = sorted(rows, key=lambda row: row['timestamp'], reverse=True)[:100]
+    return [FoodEntry(**entry) for entry in rows]
 
-@api_router.get("/food/entries/today")
-async def get_today_entries(current_user: User = Depends(get_current_user)):
+@api_router.delete("/food/entries/{entry_id}")
+async def delete_food_entry(entry_id: str, current_user: User = Depends(get_current_user)):
+    if entry_journal.enabled:
+        journaled, maybe_stored = await entry_journal.discard(current_user.id, entry_id)
+        if journaled is not None:
+            if maybe_stored:
+                # An earlier flush may have upserted it before failing; the journal copy is gone, so no
+                # retry can write it back after this
+                execute_query(supabase.table('food_entries').delete().eq('id', entry_id).eq('user_id', current_user.id))
+            publish_entry_change(current_user.id, "deleted", journaled)
+            recent_foods.invalidate(current_user.id)
+            return {"message": "Food entry deleted", "id": entry_id}
+    
+    result = execute_query(supabase.table('food_entries').delete().eq('id', entry_id).eq('user_id', current_user.id))
+    if not result.data:
+        raise HTTPException(status_code=404, detail="Food entry not found")
+    publish_entry_change(current_user.id, "deleted", result.data[0])
+    recent_foods.invalidate(current_user.id)
+    return {"message": "Food entry deleted", "id": entry_id}
+
+def entry_added(user_id: str, entry: dict):
+    publish_entry_change(user_id, "added", entry)
+    recent_foods.record(user_id, entry)
+
+def publish_entry_change(user_id: str, change: str, entry: dict):
+    """
+    Push a compact SugarPoints delta to the user's connected devices
+    Call from every path that adds or removes food entries (single, batch or import)
+    """
+    sign = -1 if change == "deleted" else 1
+    timestamp = entry.get("timestamp")
+    event_broker.publish(user_id, "totals_delta", {
+        "change": change,
+        "entry_id": entry.get("id"),
+        "day": str(timestamp)[:10] if timestamp else None,
+        "meal_type": entry.get("meal_type") or "snack",
+        "sugar_points": sign * (entry.get("sugar_points") or 0),
+        "sugar_point_blocks": sign * (entry.get("sugar_point_blocks") or 0)
+    })
+
+def fetch_today_entry_rows(user_id: str) -> List[dict]:
     today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
     tomorrow = today + timedelta(days=1)
     
-    result = supabase.table('food_entries').select('*').eq('user_id', current_user.id).gte('timestamp', today.isoformat()).lt('timestamp', tomorrow.isoformat()).execute()
-    
+    result = execute_query(supabase.table('food_entries').select('*').eq('user_id', user_id).gte('timestamp', today.isoformat()).lt('timestamp', tomorrow.isoformat()))
+    return entry_journal.merge(user_id, result.data, today.isoformat(), tomorrow.isoformat())
+
+def summarize_today_entries(rows: List[dict], daily_goal: float) -> dict:
+    """
+    Build today's entries, meal grouping and SugarPoints totals from food_entries rows
+    """
     entries = []
     total_sugar_points = 0
     total_sugar_point_blocks = 0
     
-    for entry_data in result.data:
+    for entry_data in rows:
         # Handle entries that might not have new SugarPoints columns yet
         carbs_per_100g = entry_data.get('carbs_per_100g', 0.0)
         fat_per_100g = entry_data.get('fat_per_100g', 0.0)
@@ -683,43 +888,366 @@ async def get_today_entries(current_user: User = Depends(get_current_user)):
         "sugar_point_blocks_text": f"{total_sugar_point_blocks_rounded} Blocks",
         # Legacy fields for backward compatibility
         "total_sugar": sum(entry.sugar_content * entry.portion_size for entry in entries),  # Deprecated
-        "daily_goal": current_user.daily_sugar_goal,  # Deprecated - will be removed
+        "daily_goal": daily_goal,  # Deprecated - will be removed
         "percentage": 0  # Deprecated - SugarPoints don't use percentage goals
     }
 
+@api_router.get("/food/entries/today")
+async def get_today_entries(current_user: User = Depends(get_current_user)):
+    rows = fetch_today_entry_rows(current_user.id)
+    return summarize_today_entries(rows, current_user.daily_sugar_goal)
+
+# Dashboard: one round trip for app launch
+DASHBOARD_SECTIONS = ("profile", "today", "popular")
+
+@api_router.get("/dashboard")
+async def get_dashboard(include: Optional[str] = None, popular_category: Optional[str] = None, popular_limit: int = 10,
+                        user_data: dict = Depends(get_current_user_row)):
+    """
+    Profile, today's entries/totals and popular foods in a single response
+    `include` is a comma-separated subset of profile,today,popular (default: all)
+    """
+    sections = [section.strip() for section in include.split(",")] if include else list(DASHBOARD_SECTIONS)
+    unknown = [section for section in sections if section not in DASHBOARD_SECTIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown dashboard sections: {', '.join(unknown)}")
+    
+    current_user = await get_current_user(user_data)
+    response = {}
+    errors = {}
+    
+    if "profile" in sections:
+        # Already loaded by authentication
+        response["profile"] = format_user_profile(user_data)
+    
+    # Run the remaining sections concurrently; the Supabase client is synchronous so it goes to a thread
+    pending = {}
+    if "today" in sections:
+        pending["today"] = asyncio.to_thread(fetch_today_entry_rows, current_user.id)
+    if "popular" in sections:
+        pending["popular"] = popular_foods.results(popular_category, popular_limit)
+    
+    results = await asyncio.gather(*pending.values(), return_exceptions=True)
+    for section, result in zip(pending.keys(), results):
+        if isinstance(result, Exception):
+            logger.error("Dashboard section %s failed: %s", section, result)
+            errors[section] = "unavailable"
+        elif section == "today":
+            response["today"] = summarize_today_entries(result, current_user.daily_sugar_goal)
+        elif section == "popular":
+            popular, source = result
+            response["popular"] = {
+                "results": popular,
+                "category": popular_category,
+                "count": len(popular),
+                "source": source
+            }
+    
+    if errors:
+        response["errors"] = errors
+    return response
+
+# Realtime push of today's SugarPoints totals
+@api_router.get("/events/today")
+async def stream_today_events(request: Request, last_event_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    """
+    Server-sent events: a "totals" snapshot on connect, then a "totals_delta" per entry change
+    Reconnects with Last-Event-ID (header or query param) resume without a new snapshot when possible
+    """
+    resume_from = request.headers.get("last-event-id") or last_event_id
+    
+    subscription = event_broker.subscribe(current_user.id, resume_from)
+    initial = None
+    if not subscription.resumed:
+        try:
+            rows = await asyncio.to_thread(fetch_today_entry_rows, current_user.id)
+        except Exception as e:
+            event_broker.unsubscribe(subscription)
+            logger.error("Realtime snapshot error: %s", e)
+            raise HTTPException(status_code=500, detail="Realtime service unavailable")
+        summary = summarize_today_entries(rows, current_user.daily_sugar_goal)
+        # entry_ids lets the client skip deltas already reflected in this snapshot
+        initial = (None, "totals", {
+            "day": datetime.utcnow().date().isoformat(),
+            "total_sugar_points": summary["total_sugar_points"],
+            "total_sugar_point_blocks": summary["total_sugar_point_blocks"],
+            "entry_ids": [entry.id for entry in summary["entries"]]
+        })
+    
+    return StreamingResponse(
+        event_broker.stream(subscription, initial),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Delta sync for the mobile client
+@api_router.get("/sync")
+async def delta_sync(since: Optional[str] = None, page_size: int = 100, current_user: User = Depends(get_current_user)):
+    """
+    Return food entries, profile fields and quiz results changed since the client's sync token,
+    plus tombstones for deleted entries. Call again with the returned token while has_more is true.
+    """
+    try:
+        since_seq = decode_sync_token(since)
+    except InvalidSyncToken as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    page_size = max(1, min(page_size, SYNC_MAX_PAGE_SIZE))
+    user_id = current_user.id
+    
+    try:
+        # Database time is read first, so every row stamped before it is already visible to the reads below
+        clock_result = await asyncio.to_thread(lambda: supabase.rpc('sync_clock').execute())
+        # Both change reads walk the (user_id, change_seq) indexes; fetch one extra row to detect more pages.
+        # The profile row is read uncached: a cached copy could let the cursor pass a change it doesn't show
+        entries_result, tombstones_result, user_result = await asyncio.gather(
+            asyncio.to_thread(execute_query, supabase.table('food_entries').select('*').eq('user_id', user_id).gt('change_seq', since_seq).order('change_seq').limit(page_size + 1)),
+            asyncio.to_thread(execute_query, supabase.table('sync_tombstones').select('*').eq('user_id', user_id).gt('change_seq', since_seq).order('change_seq').limit(page_size + 1)),
+            asyncio.to_thread(execute_query, supabase.table('users').select('*').eq('id', user_id))
+        )
+    except Exception as e:
+        logger.error("Delta sync query failed (is delta_sync_migration.sql applied?): %s", e)
+        raise HTTPException(status_code=503, detail="Sync service unavailable")
+    if not user_result.data:
+        raise HTTPException(status_code=401, detail="User not found")
+    user_data = {key: value for key, value in user_result.data[0].items() if key != "password"}
+    settled_before = datetime.fromisoformat(str(clock_result.data).replace('Z', '+00:00')) - timedelta(seconds=SYNC_SETTLE_SECONDS)
+    
+    page = build_sync_page(since_seq, entries_result.data, tombstones_result.data, user_data, page_size,
+                           settled_before)
+    response = {
+        "entries": [FoodEntry(**row) for row in page["entries"]],
+        "deleted": page["deleted"],
+        "has_more": page["has_more"],
+        "sync_token": page["sync_token"]
+    }
+    if page["profile_changed"]:
+        response["profile"] = format_user_profile(user_data)
+        response["quiz"] = {
+            "body_type": user_data.get("body_type"),
+            "sugarpoints_range": user_data.get("sugarpoints_range"),
+            "onboarding_path": user_data.get("onboarding_path"),
+            "quiz_completed_at": user_data.get("quiz_completed_at")
+        }
+    return response
+
+# Recent and frequent foods
+def load_recent_entry_rows(user_id: str) -> List[dict]:
+    since = datetime.utcnow() - timedelta(days=RECENT_FOODS_LOOKBACK_DAYS)
+    result = execute_query(supabase.table('food_entries').select('*').eq('user_id', user_id).gte('timestamp', since.isoformat()).order('timestamp', desc=True).limit(500))
+    return entry_journal.merge(user_id, result.data, since.isoformat())
+
+async def get_recent_foods_index(user_id: str) -> dict:
+    index = recent_foods.get(user_id)
+    if index is None:
+        rows = await asyncio.to_thread(load_recent_entry_rows, user_id)
+        index = recent_foods.build(user_id, rows)
+    return index
+
+@api_router.get("/food/suggestions")
+async def get_food_suggestions(query: Optional[str] = None, limit: int = 10, current_user: User = Depends(get_current_user)):
+    """
+    The user's own recent and frequent foods, optionally filtered by a name prefix
+    """
+    try:
+        index = await get_recent_foods_index(current_user.id)
+        results = recent_foods.suggest(index, query, max(1, min(limit, 50)))
+        return {
+            "results": results,
+            "query": query,
+            "count": len(results),
+            "source": "recent"
+        }
+    except Exception as e:
+        logger.error("Food suggestions error: %s", e)
+        raise HTTPException(status_code=500, detail="Food suggestions unavailable")
+
+# Federated search sources
+async def search_recent_foods(user_id: str, query: str, limit: int) -> List[dict]:
+    index = await get_recent_foods_index(user_id)
+    return recent_foods.suggest(index, query, limit)
+
+async def search_food_catalog(query: str, limit: int) -> List[dict]:
+    return food_catalog.search(query, limit)
+
+async def search_passio(query: str, limit: int, offset: int = 0, canonicalize: bool = True) -> Optional[List[dict]]:
+    results = await passio_service.search_food(query, limit, offset, fallback=False, canonicalize=canonicalize)
+    if results:
+        # Also runs when Passio misses the search deadline, so the next search can answer locally
+        food_catalog.learn(results)
+    return results
+
+async def search_passio_tail(query: str, limit: int, merged: List[dict], start: int,
+                             count: int) -> Optional[tuple]:
+    """
+    Results [start, start + count) of Passio's pages after its first, minus foods the merged list already
+    showed (same name and brand, including ones that came from the catalog or recent foods)
+    Walks the pages from the second one on (cached after the first request), so positions don't drift
+    when duplicates are dropped; returns (items, has_more, offset of the next page to read) or None
+    """
+    shown = {_dedupe_key(item) for item in merged}
+    stream = []
+    passio_offset = limit
+    while True:
+        page = await search_passio(query, limit, passio_offset)
+        if page is None:
+            return None
+        passio_offset += limit
+        for item in page:
+            key = _dedupe_key(item)
+            if key not in shown:
+                shown.add(key)
+                stream.append(item)
+        if len(page) < limit or len(stream) > start + count:
+            return stream[start:start + count], len(stream) > start + count or len(page) == limit, passio_offset
+
+def prefetch_result_details(results: List[dict]):
+    """
+    Speculatively warm the details cache for the top results the user is likely to tap
+    """
+    details_prefetcher.schedule(
+        [item.get("id") for item in results],
+        lambda food_id: is_synthetic_food_id(food_id) or passio_service.details_cache.get(food_id) is not None,
+        passio_service.get_food_details
+    )
+
+async def fetch_typeahead_matches(prefix: str, limit: int) -> tuple:
+    """
+    Catalog and Passio matches for a typeahead prefix; only cacheable if Passio answered in time
+    Passio gets the prefix as typed: canonicalizing a partial word ("pop", "chees") changes what it matches
+    """
+    catalog = await search_food_catalog(prefix, limit)
+    results, sources = await federated_search(prefix, limit, {
+        "catalog": asyncio.sleep(0, result=catalog),
+        "passio": search_passio(prefix, limit, canonicalize=False)
+    }, SEARCH_DEADLINE_SECONDS)
+    # The catalog matches by substring, so fewer than limit matches is all of them
+    return results, sources["passio"]["status"] == "ok", catalog if len(catalog) < limit else None
+
+@api_router.get("/food/typeahead")
+async def food_typeahead(request: Request, q: str = "", limit: int = 8, current_user: User = Depends(get_current_user)):
+    """
+    Search-as-you-type: call on every keystroke with the full text typed so far
+    A newer request from the same client (user + optional X-Client-Id header) supersedes older ones
+    """
+    limit = max(1, min(limit, 20))
+    client_id = f"{current_user.id}:{request.headers.get('x-client-id', '')}"
+    try:
+        suggestion = await typeahead.suggest(client_id, q, limit, fetch_typeahead_matches)
+    except Exception as e:
+        logger.error("Typeahead error: %s", e)
+        raise HTTPException(status_code=500, detail="Food search service unavailable")
+    if suggestion is None:
+        return {"results": [], "query": q, "count": 0, "source": None, "superseded": True}
+    
+    results, source = suggestion
+    if source != "too_short":
+        # The user's own foods lead; they're per user so they stay out of the shared prefix cache
+        index = recent_foods.get(current_user.id)
+        recent = recent_foods.suggest(index, q, limit) if index is not None else []
+        recent_names = {item["name"].lower() for item in recent}
+        results = (recent + [item for item in results if item["name"].lower() not in recent_names])[:limit]
+    return {"results": results, "query": q, "count": len(results), "source": source, "superseded": False}
+
 # NEW PASSIO FOOD DATABASE ROUTES
 @api_router.post("/food/search")
 async def search_food(search_query: FoodSearchQuery, current_user: User = Depends(get_current_user)):
     """
-    Search for food items using Passio Nutrition AI
+    Federated food search over the user's recent foods, the local catalog and Passio Nutrition AI
+    A repeat log answered from the already-built recent foods index never calls Passio; otherwise all
+    sources run concurrently and whatever arrived within SEARCH_DEADLINE_SECONDS is merged and ranked
     """
     try:
-        results = await passio_service.search_food(search_query.query, search_query.limit)
+        query = search_query.query
+        limit = max(1, min(search_query.limit or 20, 50))
+        offset = max(0, search_query.offset or 0)
+        
+        index = recent_foods.get(current_user.id) if offset == 0 else None
+        if index is not None:
+            recent = recent_foods.suggest(index, query, limit)
+            query_key = canonicalize_query(query)
+            if recent and (len(recent) >= limit or any(canonicalize_query(item["name"]) == query_key for item in recent)):
+                return {
+                    "results": recent,
+                    "query": query,
+                    "count": len(recent),
+                    "source": "recent",
+                    "sources": {"recent": {"status": "ok", "count": len(recent)}},
+                    "offset": 0,
+                    # More matches may exist beyond the user's own foods: the next page runs the federated search
+                    "has_more": True,
+                    "next_offset": limit
+                }
+        
+        # Every page re-ranks the same candidates (each source's first page, cached after the first
+        # request) in full, so later pages continue the merged list rather than restarting Passio at
+        # offset=limit and losing the Passio results page one pushed out
+        merged, sources = await federated_search(query, 3 * limit, {
+            "recent": search_recent_foods(current_user.id, query, limit),
+            "catalog": search_food_catalog(query, limit),
+            "passio": search_passio(query, limit)
+        }, SEARCH_DEADLINE_SECONDS)
+        results = merged[offset:offset + limit]
+        has_more = len(merged) > offset + limit
+        # Past the merged list, pages continue with Passio results beyond its first page
+        passio_has_more = sources["passio"].get("count") == limit
+        next_offset = offset + limit
+        next_passio_offset = limit
+        if passio_has_more and len(results) < limit:
+            needed = limit - len(results)
+            fetch = asyncio.ensure_future(
+                search_passio_tail(query, limit, merged, max(0, offset - len(merged)), needed)
+            )
+            try:
+                # Shielded: pages that miss the deadline still land in the search cache for the retry
+                tail = await asyncio.wait_for(asyncio.shield(fetch), timeout=SEARCH_DEADLINE_SECONDS)
+            except asyncio.TimeoutError:
+                logger.warning("Passio search tail for %r missed the deadline", query)
+                fetch.add_done_callback(lambda task: task.cancelled() or task.exception())
+                # The next page picks up where this one stopped
+                has_more = True
+                next_offset = offset + len(results)
+            else:
+                if tail is not None:
+                    items, has_more, next_passio_offset = tail
+                    results = results + items
+                else:
+                    has_more = False
+        elif passio_has_more:
+            has_more = True
+        
+        if has_more and passio_has_more and next_offset + limit > len(merged):
+            # Fetch the Passio page the next page will need while the user reads this one
+            passio_service.prefetch_search_page(query, limit, next_passio_offset)
+        prefetch_result_details(results)
         return {
             "results": results,
-            "query": search_query.query,
+            "query": query,
             "count": len(results),
-            "source": "passio_ai"
+            "source": "federated",
+            "sources": sources,
+            "offset": offset,
+            "has_more": has_more,
+            "next_offset": next_offset if has_more else None
         }
     except Exception as e:
-        logger.error(f"Food search error: {str(e)}")
+        logger.error("Food search error: %s", e)
         raise HTTPException(status_code=500, detail="Food search service unavailable")
 
 @api_router.get("/food/popular")
-async def get_popular_foods(category: Optional[str] = None, limit: int = 20, current_user: User = Depends(get_current_user)):
+async def get_popular_foods(request: Request, category: Optional[str] = None, limit: int = 20,
+                            current_user: User = Depends(get_current_user)):
     """
     Get popular/trending foods
+    Served from the background-refreshed snapshot; supports If-None-Match revalidation
     """
     try:
-        results = await passio_service.get_popular_foods(category, limit)
-        return {
-            "results": results,
-            "category": category,
-            "count": len(results),
-            "source": "passio_ai"
-        }
+        popular = await popular_foods.response(category, limit)
+        headers = {"ETag": popular.etag, "Cache-Control": f"private, max-age={POPULAR_FOODS_MAX_AGE_SECONDS}"}
+        if popular.etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        return Response(content=popular.body, media_type="application/json", headers=headers)
     except Exception as e:
-        logger.error(f"Popular foods error: {str(e)}")
+        logger.error("Popular foods error: %s", e)
         raise HTTPException(status_code=500, detail="Popular foods service unavailable")
 
 @api_router.get("/food/details/{food_id}")
@@ -727,6 +1255,7 @@ async def get_food_details(food_id: str, current_user: User = Depends(get_curren
     """
     Get detailed nutrition information for a specific food
     """
+    details_prefetcher.record_request(food_id)
     try:
         details = await passio_service.get_food_details(food_id)
         if not details:
@@ -735,30 +1264,287 @@ async def get_food_details(food_id: str, current_user: User = Depends(get_curren
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Food details error: {str(e)}")
+        logger.error("Food details error: %s", e)
         raise HTTPException(status_code=500, detail="Food details service unavailable")
 
+async def _recognize_image_bytes(image_data: bytes, user_id: str) -> dict:
+    """
+    Shared recognition path for the base64 and binary upload endpoints
+    """
+    # Validate, orient, strip metadata and downsize before upload
+    prepared = await image_pipeline.prepare_async(image_data)
+    
+    # Near-duplicate of a photo this user recently sent: reuse its results
+    cached = recognition_cache.get(user_id, prepared.fingerprint)
+    if cached is not None:
+        return {
+            "results": cached,
+            "count": len(cached),
+            "source": "passio_ai_vision",
+            "cached": True
+        }
+    
+    # Get recognition results
+    upload_started = time.perf_counter()
+    results = await passio_service.recognize_food_from_image(prepared.data, prepared.filename, prepared.content_type)
+    image_pipeline.record_upload(prepared, (time.perf_counter() - upload_started) * 1000)
+    recognition_cache.put(user_id, prepared.fingerprint, results)
+    
+    return {
+        "results": results,
+        "count": len(results),
+        "source": "passio_ai_vision",
+        "cached": False
+    }
+
+async def _cap_stream(chunks, max_bytes: int, limit_bytes: Optional[int] = None):
+    """
+    Pass an upload stream through, rejecting it as soon as it exceeds max_bytes
+    (limit_bytes is the image limit quoted in the error, when max_bytes includes form overhead)
+    """
+    received = 0
+    async for chunk in chunks:
+        received += len(chunk)
+        if received > max_bytes:
+            limit = limit_bytes or max_bytes
+            raise HTTPException(status_code=413, detail=f"Image exceeds {limit // (1024 * 1024)} MB limit")
+        yield chunk
+
+async def _read_upload_capped(chunks, max_bytes: int) -> bytes:
+    """
+    Collect an upload stream, rejecting it as soon as it exceeds max_bytes
+    Chunks are joined once at the end so the body is only copied into its final buffer a single time
+    """
+    return b"".join([chunk async for chunk in _cap_stream(chunks, max_bytes)])
+
+async def _iter_upload_file(upload, chunk_size: int = 256 * 1024):
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
 @api_router.post("/food/recognize")
 async def recognize_food_from_image(image_request: ImageRecognitionRequest, current_user: User = Depends(get_current_user)):
     """
-    Recognize food from image using Passio AI
+    Recognize food from image using Passio AI (legacy base64 JSON body)
     """
     try:
-        # Decode base64 image
-        image_data = base64.b64decode(image_request.image_base64)
+        # Decode base64 image off the event loop (phone photos are several MB)
+        try:
+            image_data = await asyncio.to_thread(base64.b64decode, image_request.image_base64)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid base64 image data")
         
-        # Get recognition results
-        results = await passio_service.recognize_food_from_image(image_data)
+        return await _recognize_image_bytes(image_data, current_user.id)
+    except HTTPException:
+        raise
+    except ImageValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Food recognition error: %s", e)
+        raise HTTPException(status_code=500, detail="Food recognition service unavailable")
+
+@api_router.post("/food/recognize/upload")
+async def recognize_food_from_upload(request: Request, current_user: User = Depends(get_current_user)):
+    """
+    Recognize food from an image sent as multipart/form-data (field "image") or as a raw image/* body
+    """
+    max_bytes = image_pipeline.max_input_bytes
+    # Room for the multipart boundary and part headers around the image
+    max_body_bytes = max_bytes + 64 * 1024
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_body_bytes:
+        raise HTTPException(status_code=413, detail=f"Image exceeds {max_bytes // (1024 * 1024)} MB limit")
+    
+    try:
+        content_type = request.headers.get("content-type", "")
+        if content_type.startswith("multipart/form-data"):
+            # Parse the multipart stream as it arrives, capped: request.form() would spool the whole body
+            # first, and a chunked upload has no Content-Length to reject up front
+            parser = MultiPartParser(request.headers, _cap_stream(request.stream(), max_body_bytes, max_bytes),
+                                     max_files=1, max_fields=5)
+            try:
+                form = await parser.parse()
+            except MultiPartException as e:
+                raise HTTPException(status_code=400, detail=e.message)
+            upload = form.get("image")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="Missing image file field")
+            try:
+                image_data = await _read_upload_capped(_iter_upload_file(upload), max_bytes)
+            finally:
+                await form.close()
+        elif content_type.startswith("image/") or content_type == "application/octet-stream":
+            image_data = await _read_upload_capped(request.stream(), max_bytes)
+        else:
+            raise HTTPException(status_code=415, detail="Send multipart/form-data or an image/* body")
+        
+        return await _recognize_image_bytes(image_data, current_user.id)
+    except HTTPException:
+        raise
+    except ImageValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error("Food recognition upload error: %s", e)
+        raise HTTPException(status_code=500, detail="Food recognition service unavailable")
+
+def build_plate_meal(recognitions: List[dict], details_by_id: Dict[str, Optional[dict]], meal_type: str) -> dict:
+    """
+    Turn recognized plate items into a ready-to-log meal with per-item SugarPoints and totals
+    Prefers nutrition from Passio details and falls back to the recognition payload
+    """
+    items = []
+    total_sugar_points = 0
+    total_carbs = 0.0
+    
+    for recognition in recognitions:
+        details = details_by_id.get(recognition.get("id")) or {}
+        portion_size = float(recognition.get("estimated_weight") or 100)
+        carbs_per_100g = details.get("carbs_per_100g", recognition.get("carbs_per_100g", 0.0))
+        sugar_points_data = calculate_sugar_points(carbs_per_100g, portion_size)
+        
+        items.append({
+            "food_id": recognition.get("id"),
+            "name": details.get("name") or recognition.get("name"),
+            "confidence": recognition.get("confidence", 0.0),
+            "portion_size": portion_size,
+            "carbs_per_100g": carbs_per_100g,
+            "fat_per_100g": details.get("fat_per_100g", recognition.get("fat_per_100g", 0.0)),
+            "protein_per_100g": details.get("protein_per_100g", recognition.get("protein_per_100g", 0.0)),
+            "meal_type": meal_type,
+            "details_found": bool(details),
+            **sugar_points_data
+        })
+        total_sugar_points += sugar_points_data["sugar_points"]
+        total_carbs += carbs_per_100g * portion_size / 100
+    
+    total_blocks = round(total_sugar_points / 6) if total_sugar_points > 0 else 0
+    return {
+        "meal_type": meal_type,
+        "items": items,
+        "totals": {
+            "item_count": len(items),
+            "total_carbs": round(total_carbs, 1),
+            "total_sugar_points": total_sugar_points,
+            "total_sugar_point_blocks": total_blocks,
+            "sugar_points_text": f"{total_sugar_points} SugarPoints" if total_sugar_points > 0 else "Nil SugarPoints",
+            "sugar_point_blocks_text": f"{total_blocks} Blocks"
+        }
+    }
+
+@api_router.post("/food/recognize/plate")
+async def recognize_plate(plate_request: PlateRecognitionRequest, current_user: User = Depends(get_current_user)):
+    """
+    Recognize every item on a plate, look up their details concurrently and return a meal with totals
+    """
+    try:
+        try:
+            image_data = await asyncio.to_thread(base64.b64decode, plate_request.image_base64)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid base64 image data")
+        
+        recognition = await _recognize_image_bytes(image_data, current_user.id)
+        recognitions = [
+            item for item in recognition["results"]
+            if item.get("confidence", 0.0) >= (plate_request.min_confidence or 0.0)
+        ]
+        
+        details_by_id = await passio_service.get_food_details_many(
+            [item.get("id") for item in recognitions],
+            max_concurrency=PLATE_DETAILS_CONCURRENCY
+        )
         
         return {
-            "results": results,
-            "count": len(results),
+            "meal": build_plate_meal(recognitions, details_by_id, plate_request.meal_type or "snack"),
+            "cached": recognition["cached"],
             "source": "passio_ai_vision"
         }
+    except HTTPException:
+        raise
+    except ImageValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Food recognition error: {str(e)}")
+        logger.error("Plate recognition error: %s", e)
         raise HTTPException(status_code=500, detail="Food recognition service unavailable")
 
+# Asynchronous recognition jobs
+@api_router.post("/food/recognize/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_recognition_job(job_request: RecognitionJobRequest, current_user: User = Depends(get_current_user)):
+    """
+    Queue recognition of one or more photos and return a job ID immediately
+    """
+    if not job_request.images_base64:
+        raise HTTPException(status_code=400, detail="At least one image is required")
+    if len(job_request.images_base64) > recognition_jobs.max_images_per_job:
+        raise HTTPException(status_code=400, detail=f"A job can contain at most {recognition_jobs.max_images_per_job} images")
+    
+    try:
+        images = await asyncio.to_thread(lambda: [base64.b64decode(image) for image in job_request.images_base64])
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid base64 image data")
+    
+    async def recognize(image_data: bytes) -> dict:
+        return await _recognize_image_bytes(image_data, current_user.id)
+    
+    try:
+        job = recognition_jobs.submit(current_user.id, images, recognize)
+    except JobLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/food/recognize/jobs/{job.id}",
+        "events_url": f"/api/food/recognize/jobs/{job.id}/events"
+    }
+
+@api_router.get("/food/recognize/jobs/{job_id}")
+async def get_recognition_job(job_id: str, current_user: User = Depends(get_current_user)):
+    """
+    Poll a recognition job's status and any finished results
+    """
+    job = recognition_jobs.get(job_id, current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@api_router.get("/food/recognize/jobs/{job_id}/events")
+async def stream_recognition_job(job_id: str, current_user: User = Depends(get_current_user)):
+    """
+    Server-sent events: an "update" event per change and a final "done" event
+    """
+    job = recognition_jobs.get(job_id, current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    def render():
+        event = "done" if job.done else "update"
+        return f"event: {event}\ndata: {json.dumps(job.to_dict())}\n\n"
+    
+    async def event_stream():
+        changed = job.changed
+        yield render()
+        while not job.done:
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=15)
+            except asyncio.TimeoutError:
+                # Heartbeat keeps mobile connections and proxies from timing out
+                yield ": keep-alive\n\n"
+                continue
+            changed = job.changed
+            yield render()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @api_router.post("/food/barcode")
 async def get_barcode_nutrition(barcode_request: BarcodeRequest, current_user: User = Depends(get_current_user)):
     """
@@ -772,7 +1558,7 @@ async def get_barcode_nutrition(barcode_request: BarcodeRequest, current_user: U
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Barcode lookup error: {str(e)}")
+        logger.error("Barcode lookup error: %s", e)
         raise HTTPException(status_code=500, detail="Barcode lookup service unavailable")
 
 # AI Chat routes using OpenAI directly
@@ -780,21 +1566,24 @@ async def get_barcode_nutrition(barcode_request: BarcodeRequest, current_user: U
 async def ai_chat(chat_data: ChatMessage, current_user: User = Depends(get_current_user)):
     try:
         # Create OpenAI chat completion
-        response = openai.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"You are a friendly and knowledgeable AI nutritionist and dietary coach for {current_user.name}. Help users track their sugar intake, provide healthy eating advice, and support their wellness journey. Be encouraging, informative, and personalized in your responses. The user's daily sugar goal is {current_user.daily_sugar_goal}g."
-                },
-                {
-                    "role": "user", 
-                    "content": chat_data.message
-                }
-            ],
-            max_tokens=500,
-            temperature=0.7
-        )
+        with tracer.start_span("openai.chat.completions", {"llm.model": "gpt-4o-mini"}, kind=SPAN_KIND_CLIENT), track_call("openai"):
+            response = openai.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": f"You are a friendly and knowledgeable AI nutritionist and dietary coach for {current_user.name}. Help users track their sugar intake, provide healthy eating advice, and support their wellness journey. Be encouraging, informative, and personalized in your responses. The user's daily sugar goal is {current_user.daily_sugar_goal}g."
+                    },
+                    {
+                        "role": "user", 
+                        "content": chat_data.message
+                    }
+                ],
+                max_tokens=500,
+                temperature=0.7
+            )
+            if getattr(response, "usage", None) is not None:
+                tracer.set_attribute("llm.total_tokens", response.usage.total_tokens)
         
         ai_response = response.choices[0].message.content
         
@@ -805,12 +1594,12 @@ async def ai_chat(chat_data: ChatMessage, current_user: User = Depends(get_curre
             "response": ai_response,
             "timestamp": datetime.utcnow().isoformat()
         }
-        supabase.table('chat_history').insert(chat_entry).execute()
+        execute_query(supabase.table('chat_history').insert(chat_entry))
         
         return {"response": ai_response}
         
     except Exception as e:
-        logger.error(f"AI Chat error: {str(e)}")
+        logger.error("AI Chat error: %s", e)
         raise HTTPException(status_code=500, detail="AI service unavailable")
 
 # Knowledge Base routes (dev-only)
@@ -858,12 +1647,90 @@ async def kb_search(query_data: KBQuery, current_user: User = Depends(get_curren
     
     return {"results": mock_results}
 
+# Admin diagnostics routes
+@api_router.get("/admin/metrics")
+async def admin_metrics(admin_user: User = Depends(get_admin_user)):
+    """
+    Internal runtime metrics for this worker
+    """
+    return {
+        "pid": os.getpid(),
+        "event_loop": loop_monitor.stats(),
+        "logging": {"dropped_records": dropped_records()},
+        "image_pipeline": image_pipeline.summary(),
+        "recognition_cache": recognition_cache.stats(),
+        "recognition_jobs": recognition_jobs.stats(),
+        "realtime": event_broker.stats(),
+        "idempotency": idempotency_store.stats(),
+        "entry_journal": entry_journal.stats(),
+        "shared_cache": shared_cache.stats(),
+        "popular_foods": popular_foods.stats(),
+        "recent_foods": recent_foods.stats(),
+        "food_catalog": food_catalog.stats(),
+        "typeahead": typeahead.stats(),
+        "search_queries": query_key_stats.stats(),
+        "details_prefetch": details_prefetcher.stats(),
+        "nutrient_estimator": nutrient_estimator.stats()
+    }
+
+@api_router.get("/admin/profile/cpu", response_class=PlainTextResponse)
+async def admin_cpu_profile(seconds: float = 10.0, interval_ms: float = 5.0, admin_user: User = Depends(get_admin_user)):
+    """
+    Sample all thread stacks for N seconds and return a flamegraph-compatible collapsed-stack file
+    """
+    if not 0 < seconds <= MAX_PROFILE_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {MAX_PROFILE_SECONDS}")
+    if not 1 <= interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 1 and 1000")
+    if sampling_profiler.busy:
+        raise HTTPException(status_code=409, detail="A profiling session is already running")
+
+    logger.info("CPU profile requested by %s for %ss", admin_user.email, seconds)
+    try:
+        # Sample from a worker thread so the event loop keeps serving (and shows up in the profile)
+        collapsed = await asyncio.to_thread(sampling_profiler.profile, seconds, interval_ms)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    filename = f"cpu-{os.getpid()}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.collapsed"
+    return PlainTextResponse(collapsed, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@api_router.post("/admin/memory/snapshots")
+async def admin_take_memory_snapshot(admin_user: User = Depends(get_admin_user)):
+    """
+    Take a tracemalloc snapshot (tracing starts with the first snapshot)
+    """
+    return await asyncio.to_thread(memory_snapshots.take)
+
+@api_router.get("/admin/memory/snapshots")
+async def admin_list_memory_snapshots(admin_user: User = Depends(get_admin_user)):
+    return {"snapshots": memory_snapshots.list()}
+
+@api_router.delete("/admin/memory/snapshots")
+async def admin_stop_memory_tracing(admin_user: User = Depends(get_admin_user)):
+    """
+    Stop tracemalloc and clear the snapshots (the next snapshot starts a fresh baseline)
+    """
+    return await asyncio.to_thread(memory_snapshots.stop)
+
+@api_router.get("/admin/memory/diff")
+async def admin_memory_diff(base: str, target: Optional[str] = None, limit: int = 25, group_by: str = "lineno", admin_user: User = Depends(get_admin_user)):
+    """
+    Diff two tracemalloc snapshots (target defaults to the latest) to find allocation growth
+    """
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be lineno, filename or traceback")
+    try:
+        return await asyncio.to_thread(memory_snapshots.diff, base, target, limit, group_by)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Snapshot {e} not found")
+
 # Health check
 @api_router.get("/health")
 async def health_check():
     # Test Supabase connection
     try:
-        supabase.table('users').select('id').limit(1).execute()
+        execute_query(supabase.table('users').select('id').limit(1))
         supabase_status = True
     except Exception:
         supabase_status = False
@@ -884,12 +1751,87 @@ async def health_check():
             "food_search": True,
             "food_recognition": True,
             "barcode_scanning": True
-        }
+        },
+        "event_loop": loop_monitor.summary()
     }
 
 # Include router
 app.include_router(api_router)
 
+# Background monitors
+@app.on_event("startup")
+async def start_monitors():
+    if LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    tracer.start()
+    recognition_jobs.start()
+    entry_journal.start(insert_journaled_entries)
+    shared_cache.start()
+    popular_foods.start()
+
+@app.on_event("shutdown")
+async def stop_monitors():
+    await loop_monitor.stop()
+    await recognition_jobs.stop()
+    await entry_journal.stop(insert_journaled_entries)
+    await shared_cache.stop()
+    await popular_foods.stop()
+    tracer.shutdown()
+
+# Server-Timing and round-trip budget middleware
+@app.middleware("http")
+async def server_timing_middleware(request, call_next):
+    metrics, token = begin_request()
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    request_id_token = request_id_var.set(request_id)
+    span_name = f"{request.method} {request.url.path}"
+    traceparent = request.headers.get("traceparent")
+    try:
+        with tracer.start_span(span_name, {"http.method": request.method}, kind=SPAN_KIND_SERVER, traceparent=traceparent) as span:
+            response = await call_next(request)
+            if span is not None:
+                route = request.scope.get("route")
+                if route is not None:
+                    span.name = f"{request.method} {route.path}"
+                    span.set_attribute("http.route", route.path)
+                span.set_attribute("http.status_code", response.status_code)
+                span.set_attribute("upstream.round_trips", metrics.round_trips)
+                response.headers["traceparent"] = span.traceparent
+    finally:
+        end_request(token)
+        request_id_var.reset(request_id_token)
+
+    response.headers["Server-Timing"] = metrics.server_timing_header()
+    response.headers["X-Request-ID"] = request_id
+    route = request.scope.get("route")
+    route_path = route.path if route is not None else request.url.path
+    access_logger.info(
+        "%s %s %s", request.method, route_path, response.status_code,
+        extra={
+            "request_id": request_id,
+            "latency_ms": round(metrics.elapsed_ms, 1),
+            "status_code": response.status_code,
+            "round_trips": metrics.round_trips
+        }
+    )
+
+    if metrics.round_trips > ROUND_TRIP_BUDGET:
+        message = (
+            f"{request.method} {route_path} made {metrics.round_trips} upstream calls "
+            f"(budget {ROUND_TRIP_BUDGET}): {metrics.server_timing_header()}"
+        )
+        if APP_ENV == "test":
+            # Fail loudly in test runs so N+1 regressions can't slip through
+            logger.error("Round-trip budget exceeded: %s", message)
+            return JSONResponse(
+                status_code=500,
+                content={"detail": f"Round-trip budget exceeded: {message}"},
+                headers={"Server-Timing": response.headers["Server-Timing"]}
+            )
+        logger.warning("Round-trip budget exceeded: %s", message)
+
+    return response
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -900,11 +1842,9 @@ app.add_middleware(
 )
 
 # Logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging(logging.INFO)
 logger = logging.getLogger(__name__)
+access_logger = logging.getLogger("sugardrop.access")
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,311 @@
+"""
+Shared Cache
+Host-wide SQLite cache tier shared by all workers, behind each worker's in-memory caches, with
+TTLs, size-bounded eviction and invalidation broadcast between workers
+"""
+
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from collections import deque
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple, Any
+
+from cachetools import TTLCache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+class SharedCache:
+    def __init__(self, path: str, enabled: bool = True, max_entries: int = 50000, sync_interval_seconds: float = 1.0,
+                 read_timeout_seconds: float = 0.05):
+        self.path = path
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.sync_interval = sync_interval_seconds
+        # Reads run on the event loop: a locked database is a miss, not a wait
+        self.read_timeout = read_timeout_seconds
+        self._reader: Optional[sqlite3.Connection] = None
+        self._writer: Optional[sqlite3.Connection] = None
+        self._db_pid: Optional[int] = None
+        self._read_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        # Writes and invalidations queued for the sync task, which applies them in a worker thread
+        self._pending: deque = deque()
+        # (namespace, key) -> newest queued op, so reads see this worker's own writes before they land
+        self._overlay: Dict[Tuple[str, str], tuple] = {}
+        self._writes = 0
+        self._last_invalidation = 0
+        # namespace -> in-memory layer to evict from when another worker invalidates a key
+        self._layers: Dict[str, "TieredCache"] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.contended = 0
+        self.errors = 0
+
+    def _open(self, timeout: float) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        # Cached rows include user profiles: owner-only, whatever the umask (SQLite gives the -wal and
+        # -shm files the database file's permissions)
+        os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+        os.chmod(self.path, 0o600)
+        db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=timeout)
+        db.execute("PRAGMA journal_mode=WAL")
+        # A cache can lose its last writes on power loss; skip the fsync per commit
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_expires ON cache_entries(expires_at)")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS cache_invalidations ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, namespace TEXT NOT NULL, key TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        return db
+
+    def _connections(self) -> Tuple[sqlite3.Connection, sqlite3.Connection]:
+        # Connections must not cross a fork, so each worker process opens its own
+        if self._writer is None or self._db_pid != os.getpid():
+            self._writer = self._open(timeout=1.0)
+            self._reader = self._open(timeout=self.read_timeout)
+            self._db_pid = os.getpid()
+            self._last_invalidation = self._writer.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM cache_invalidations"
+            ).fetchone()[0]
+        return self._reader, self._writer
+
+    def register(self, layer: "TieredCache"):
+        self._layers[layer.namespace] = layer
+
+    def get(self, namespace: str, key: str) -> Any:
+        if not self.enabled:
+            return _MISSING
+        queued = self._overlay.get((namespace, key))
+        if queued is not None:
+            return _MISSING if queued[0] == "invalidate" else json.loads(queued[3])
+        if not self._read_lock.acquire(blocking=False):
+            self.contended += 1
+            return _MISSING
+        try:
+            row = self._connections()[0].execute(
+                "SELECT value FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time())
+            ).fetchone()
+        except sqlite3.OperationalError as e:
+            # Usually "database is locked" past the short read timeout
+            self.contended += 1
+            logger.debug("Shared cache read skipped: %s", e)
+            return _MISSING
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning("Shared cache read failed: %s", e)
+            return _MISSING
+        finally:
+            self._read_lock.release()
+        if row is None:
+            self.misses += 1
+            return _MISSING
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: float):
+        if not self.enabled:
+            return
+        self._enqueue(("set", namespace, key, json.dumps(value, default=str, separators=(",", ":")),
+                       time.time() + ttl_seconds))
+
+    def invalidate(self, namespace: str, key: str):
+        """
+        Delete a key from the shared tier and tell every worker to drop its in-memory copy
+        """
+        if not self.enabled:
+            return
+        self._enqueue(("invalidate", namespace, key))
+
+    def _enqueue(self, op: tuple):
+        if self._task is None:
+            # No sync task (scripts, or before startup): write straight through
+            try:
+                self._write_ops([op])
+            except sqlite3.Error as e:
+                self.errors += 1
+                logger.warning("Shared cache write failed: %s", e)
+            return
+        self._overlay[(op[1], op[2])] = op
+        self._pending.append(op)
+
+    def _write_ops(self, ops: List[tuple]):
+        """
+        Apply queued writes in one transaction; blocking, so called from a worker thread
+        """
+        with self._write_lock:
+            db = self._connections()[1]
+            now = time.time()
+            db.execute("BEGIN")
+            try:
+                for op in ops:
+                    if op[0] == "set":
+                        db.execute(
+                            "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                            op[1:]
+                        )
+                    else:
+                        db.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", op[1:])
+                        db.execute(
+                            "INSERT INTO cache_invalidations (namespace, key, created_at) VALUES (?, ?, ?)",
+                            (op[1], op[2], now)
+                        )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            previous, self._writes = self._writes, self._writes + len(ops)
+            if previous // 100 != self._writes // 100:
+                self._evict(db)
+
+    def _evict(self, db: sqlite3.Connection):
+        """
+        Drop expired entries, then the soonest-expiring ones beyond max_entries
+        """
+        now = time.time()
+        db.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+        count = db.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        if count > self.max_entries:
+            db.execute(
+                "DELETE FROM cache_entries WHERE rowid IN "
+                "(SELECT rowid FROM cache_entries ORDER BY expires_at LIMIT ?)",
+                (count - self.max_entries,)
+            )
+        db.execute("DELETE FROM cache_invalidations WHERE created_at < ?", (now - 3600,))
+
+    def _read_invalidations(self) -> List[tuple]:
+        with self._write_lock:
+            return self._connections()[1].execute(
+                "SELECT seq, namespace, key FROM cache_invalidations WHERE seq > ? ORDER BY seq",
+                (self._last_invalidation,)
+            ).fetchall()
+
+    def apply_invalidations(self, rows: List[tuple]) -> int:
+        """
+        Evict keys invalidated by any worker since the last check from the registered in-memory layers
+        """
+        for seq, namespace, key in rows:
+            layer = self._layers.get(namespace)
+            if layer is not None:
+                layer.local.pop(key, None)
+            self._last_invalidation = seq
+        return len(rows)
+
+    async def sync_once(self):
+        """
+        Write queued ops, then pick up other workers' invalidations; the SQLite work runs off the loop
+        """
+        ops = list(self._pending)
+        self._pending.clear()
+        try:
+            if ops:
+                await asyncio.to_thread(self._write_ops, ops)
+        finally:
+            for op in ops:
+                # A newer op for the same key may have been queued meanwhile; it keeps its overlay entry
+                if self._overlay.get((op[1], op[2])) is op:
+                    del self._overlay[(op[1], op[2])]
+        self.apply_invalidations(await asyncio.to_thread(self._read_invalidations))
+
+    def start(self):
+        if self.enabled:
+            self._task = asyncio.get_running_loop().create_task(self._sync_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            # Last attempt at queued writes
+            try:
+                await self.sync_once()
+            except sqlite3.Error as e:
+                logger.warning("Shared cache final sync failed: %s", e)
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync_once()
+            except sqlite3.Error as e:
+                # Queued writes are dropped: losing a cache write only costs a later miss
+                self.errors += 1
+                logger.warning("Shared cache sync failed: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "contended_reads": self.contended,
+            "queued_writes": len(self._pending),
+            "errors": self.errors,
+            "namespaces": {namespace: layer.stats() for namespace, layer in self._layers.items()}
+        }
+
+class TieredCache:
+    """
+    In-memory TTLCache in front of the shared tier: reads fall through and populate memory,
+    writes go to both, invalidations reach every worker
+    """
+    def __init__(self, namespace: str, maxsize: int, ttl_seconds: float, shared: "SharedCache"):
+        self.namespace = namespace
+        self.ttl = ttl_seconds
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
+        self.shared = shared
+        self.local_hits = 0
+        shared.register(self)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self.local_hits += 1
+            return value
+        value = self.shared.get(self.namespace, key)
+        if value is _MISSING:
+            return default
+        self.local[key] = value
+        return value
+
+    def set(self, key: str, value: Any):
+        self.local[key] = value
+        self.shared.set(self.namespace, key, value, self.ttl)
+
+    def replace(self, key: str, value: Any):
+        """
+        Like set, but for a value that changed: other workers drop their in-memory copy too
+        """
+        self.shared.invalidate(self.namespace, key)
+        self.set(key, value)
+
+    def invalidate(self, key: str):
+        self.local.pop(key, None)
+        self.shared.invalidate(self.namespace, key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"local_entries": len(self.local), "local_hits": self.local_hits, "ttl_seconds": self.ttl}
+
+# Global instance
+shared_cache = SharedCache(
+    path=os.getenv('SHARED_CACHE_PATH', str(Path(__file__).parent / 'shared_cache' / 'shared_cache.sqlite3')),
+    enabled=os.getenv('SHARED_CACHE_ENABLED', 'true').lower() == 'true',
+    max_entries=int(os.getenv('SHARED_CACHE_MAX_ENTRIES', '50000'))
+)
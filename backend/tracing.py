@@ -0,0 +1,279 @@
+"""
+Request Tracing
+Lightweight OpenTelemetry-style spans with a background exporter (JSON lines file or OTLP/HTTP JSON)
+"""
+
+import os
+import json
+import time
+import queue
+import random
+import secrets
+import threading
+import functools
+import logging
+import contextvars
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Any
+
+import httpx
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+class Span:
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: int,
+                 attributes: Optional[Dict[str, Any]] = None, sampled: bool = True):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.sampled = sampled
+        self.status = STATUS_UNSET
+        self.status_message: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_error(self, error: BaseException):
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round(((self.end_ns or self.start_ns) - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": {"code": self.status, "message": self.status_message}
+        }
+
+class FileSpanExporter:
+    """
+    Appends one JSON object per span to a local file
+    """
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]):
+        with open(self.path, "a", encoding="utf-8") as handle:
+            for span in spans:
+                handle.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+    def shutdown(self):
+        pass
+
+class OtlpHttpSpanExporter:
+    """
+    Posts spans in OTLP/HTTP JSON encoding to a collector (or any stand-in accepting /v1/traces)
+    """
+    def __init__(self, endpoint: str, service_name: str):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.client = httpx.Client(timeout=5.0)
+
+    def export(self, spans: List[Span]):
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [self._attribute("service.name", self.service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "sugardrop.tracing"},
+                    "spans": [self._encode(span) for span in spans]
+                }]
+            }]
+        }
+        response = self.client.post(self.endpoint, json=payload)
+        if response.status_code >= 400:
+            logger.warning("OTLP export failed with status %s", response.status_code)
+
+    def shutdown(self):
+        self.client.close()
+
+    def _encode(self, span: Span) -> Dict[str, Any]:
+        encoded = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": span.kind,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns or span.start_ns),
+            "attributes": [self._attribute(key, value) for key, value in span.attributes.items()],
+            "status": {"code": span.status, "message": span.status_message or ""}
+        }
+        if span.parent_id:
+            encoded["parentSpanId"] = span.parent_id
+        return encoded
+
+    def _attribute(self, key: str, value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+class Tracer:
+    """
+    Creates spans, tracks the active span per task and exports finished spans from a background thread
+    """
+    def __init__(self, exporter=None, sample_rate: float = 1.0, batch_size: int = 128,
+                 flush_interval: float = 2.0, max_queue: int = 10000):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max_queue)
+        self._current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+        self._worker: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def current_span(self) -> Optional[Span]:
+        return self._current.get()
+
+    def set_attribute(self, key: str, value: Any):
+        """
+        Set an attribute on the active span, if any
+        """
+        span = self._current.get()
+        if span is not None:
+            span.set_attribute(key, value)
+
+    @contextmanager
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None,
+                   kind: int = SPAN_KIND_INTERNAL, traceparent: Optional[str] = None):
+        """
+        Open a child of the active span (or a new root, optionally continuing an incoming traceparent)
+        """
+        if not self.enabled:
+            yield None
+            return
+
+        parent = self._current.get()
+        if parent is not None:
+            span = Span(name, parent.trace_id, parent.span_id, kind, attributes, parent.sampled)
+        else:
+            remote = self._parse_traceparent(traceparent)
+            if remote is not None:
+                trace_id, parent_id, sampled = remote
+            else:
+                trace_id, parent_id, sampled = secrets.token_hex(16), None, random.random() < self.sample_rate
+            span = Span(name, trace_id, parent_id, kind, attributes, sampled)
+
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(e)
+            raise
+        finally:
+            self._current.reset(token)
+            span.end_ns = time.time_ns()
+            if span.sampled:
+                self._enqueue(span)
+
+    def _parse_traceparent(self, header: Optional[str]):
+        if not header:
+            return None
+        parts = header.strip().split("-")
+        if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+            return None
+        return parts[1], parts[2], parts[3] == "01"
+
+    def _enqueue(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            # Never block a request on telemetry
+            self.dropped += 1
+
+    def start(self):
+        if not self.enabled or self._worker is not None:
+            return
+        self._stopped.clear()
+        self._worker = threading.Thread(target=self._export_loop, name="span-exporter", daemon=True)
+        self._worker.start()
+
+    def shutdown(self):
+        if self._worker is None:
+            return
+        self._stopped.set()
+        self._worker.join(timeout=self.flush_interval + 5)
+        self._worker = None
+        self.exporter.shutdown()
+
+    def _export_loop(self):
+        while True:
+            batch = self._drain()
+            if batch:
+                try:
+                    self.exporter.export(batch)
+                except Exception as e:
+                    logger.warning("Span export failed: %s", e)
+            elif self._stopped.is_set():
+                return
+
+    def _drain(self) -> List[Span]:
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_interval))
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+def traced(name: str, kind: int = SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None):
+    """
+    Decorator wrapping an async function in a span
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with tracer.start_span(name, attributes, kind=kind):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _build_exporter():
+    exporter = os.getenv('TRACING_EXPORTER', 'none').lower()
+    if exporter == 'file':
+        return FileSpanExporter(os.getenv('TRACING_FILE_PATH', '/tmp/sugardrop-spans.jsonl'))
+    if exporter == 'otlp':
+        return OtlpHttpSpanExporter(
+            os.getenv('TRACING_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces'),
+            os.getenv('TRACING_SERVICE_NAME', 'sugardrop-api')
+        )
+    return None
+
+# Global instance
+tracer = Tracer(
+    exporter=_build_exporter(),
+    sample_rate=float(os.getenv('TRACING_SAMPLE_RATE', '1.0'))
+)
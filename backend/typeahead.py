@@ -0,0 +1,164 @@
+"""
+Typeahead
+Search-as-you-type with prefix caching, per-client cancellation of superseded lookups and server-side debounce
+"""
+
+import os
+import asyncio
+import logging
+import itertools
+import contextvars
+from typing import Awaitable, Callable, List, Dict, Optional, Tuple, Any
+
+from cachetools import TTLCache
+
+from food_catalog import match_quality
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+def _prefix_key(query: str) -> str:
+    return " ".join(query.lower().split())
+
+class TypeaheadService:
+    def __init__(self, min_prefix_length: int = 2, debounce_seconds: float = 0.15, fetch_limit: int = 50,
+                 cache_size: int = 5000, cache_ttl_seconds: float = 600.0):
+        self.min_prefix_length = min_prefix_length
+        self.debounce = debounce_seconds
+        self.fetch_limit = fetch_limit
+        # prefix -> (results, local); local holds every local catalog match for the prefix, or None if the
+        # catalog had more than fetch_limit. Only the catalog matches by prefix: Passio's ranked results
+        # for "ap" needn't include its best matches for "app", so they never make an entry complete
+        self._cache = TTLCache(maxsize=cache_size, ttl=cache_ttl_seconds)
+        self._seq = itertools.count(1)
+        # client -> sequence number of its newest request
+        self._latest = TTLCache(maxsize=20000, ttl=300)
+        # client -> in-flight upstream lookup
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # prefix -> background lookup started after answering from a shorter prefix's local matches
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self.requests = 0
+        self.cache_hits = 0
+        self.prefix_hits = 0
+        self.superseded = 0
+        self.cancelled_upstream = 0
+        self.upstream_calls = 0
+        self.refreshes = 0
+
+    def _from_cache(self, prefix: str) -> Optional[Tuple[List[Dict[str, Any]], str]]:
+        cached = self._cache.get(prefix)
+        if cached is not None:
+            self.cache_hits += 1
+            return list(cached[0]), "cache"
+        # A shorter prefix's complete local matches contain every local match for this one; its cached
+        # Passio results that still match are kept too, until Passio answers for this prefix
+        for length in range(len(prefix) - 1, self.min_prefix_length - 1, -1):
+            cached = self._cache.get(prefix[:length])
+            if cached is not None and cached[1] is not None:
+                self.prefix_hits += 1
+                matches = {}
+                for item in cached[0] + cached[1]:
+                    if match_quality(item.get("name", ""), prefix) > 0:
+                        matches.setdefault(item.get("id"), item)
+                ranked = sorted(matches.values(), key=lambda item: match_quality(item.get("name", ""), prefix),
+                                reverse=True)
+                return ranked, "prefix_cache"
+        return None
+
+    async def _lookup(self, prefix: str, fetch) -> List[Dict[str, Any]]:
+        self.upstream_calls += 1
+        results, cacheable, local = await fetch(prefix, self.fetch_limit)
+        if cacheable:
+            self._cache[prefix] = (tuple(results), tuple(local) if local is not None else None)
+        return results
+
+    def _schedule_refresh(self, client_id: str, seq: int, prefix: str, fetch):
+        if prefix in self._refreshing:
+            return
+        # A fresh context: the lookup outlives this request and isn't part of its metrics or trace
+        task = contextvars.Context().run(
+            asyncio.get_running_loop().create_task, self._refresh(client_id, seq, prefix, fetch)
+        )
+        self._refreshing[prefix] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(prefix, None))
+
+    async def _refresh(self, client_id: str, seq: int, prefix: str, fetch):
+        """
+        Ask upstream about a prefix that was answered locally, so the next request for it gets Passio's
+        matches; debounced like a foreground lookup, and dropped if the client has typed again
+        """
+        await asyncio.sleep(self.debounce)
+        if self._latest.get(client_id) != seq or prefix in self._cache:
+            return
+        self.refreshes += 1
+        try:
+            await self._lookup(prefix, fetch)
+        except Exception as e:
+            logger.warning("Typeahead refresh for %r failed: %s", prefix, e)
+
+    async def suggest(self, client_id: str, query: str, limit: int,
+                      fetch: Callable[[str, int], Awaitable[Tuple[List[Dict[str, Any]], bool, Optional[List[Dict[str, Any]]]]]]
+                      ) -> Optional[Tuple[List[Dict[str, Any]], str]]:
+        """
+        Returns (results, source), or None when a newer request from the same client superseded this one
+        fetch(prefix, limit) -> (ranked results, cacheable, complete local matches or None) runs after the
+        debounce window on a cache miss, or in the background after an answer from a shorter prefix
+        """
+        self.requests += 1
+        prefix = _prefix_key(query)
+        if len(prefix) < self.min_prefix_length:
+            return [], "too_short"
+
+        seq = next(self._seq)
+        self._latest[client_id] = seq
+        cached = self._from_cache(prefix)
+        if cached is not None:
+            if cached[1] == "prefix_cache":
+                self._schedule_refresh(client_id, seq, prefix, fetch)
+            return cached[0][:limit], cached[1]
+
+        # Debounce: if the client types again within the window, this request ends without an upstream call
+        await asyncio.sleep(self.debounce)
+        if self._latest.get(client_id) != seq:
+            self.superseded += 1
+            return None
+        cached = self._from_cache(prefix)
+        if cached is not None:
+            if cached[1] == "prefix_cache":
+                self._schedule_refresh(client_id, seq, prefix, fetch)
+            return cached[0][:limit], cached[1]
+
+        previous = self._inflight.get(client_id)
+        if previous is not None and not previous.done():
+            previous.cancel()
+            self.cancelled_upstream += 1
+        task = asyncio.ensure_future(self._lookup(prefix, fetch))
+        self._inflight[client_id] = task
+        try:
+            await asyncio.wait({task})
+        finally:
+            if self._inflight.get(client_id) is task:
+                del self._inflight[client_id]
+        if task.cancelled():
+            self.superseded += 1
+            return None
+        return task.result()[:limit], "upstream"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "prefix_hits": self.prefix_hits,
+            "superseded": self.superseded,
+            "cancelled_upstream": self.cancelled_upstream,
+            "upstream_calls": self.upstream_calls,
+            "refreshes": self.refreshes,
+            "cached_prefixes": len(self._cache),
+            "in_flight": len(self._inflight)
+        }
+
+# Global instance
+typeahead = TypeaheadService(
+    min_prefix_length=int(os.getenv('TYPEAHEAD_MIN_PREFIX', '2')),
+    debounce_seconds=float(os.getenv('TYPEAHEAD_DEBOUNCE_MS', '150')) / 1000
+)
@@ -0,0 +1,51 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from delta_sync import build_sync_page, decode_sync_token, encode_sync_token, InvalidSyncToken
+
+SETTLED_BEFORE = datetime(2026, 1, 1, 12, 0, 10, tzinfo=timezone.utc)
+OLD = "2026-01-01T12:00:00+00:00"
+YOUNG = "2026-01-01T12:00:12+00:00"
+
+def entry(seq, updated_at=OLD):
+    return {"id": f"e{seq}", "change_seq": seq, "updated_at": updated_at}
+
+def tombstone(seq, deleted_at=OLD):
+    return {"entity": "food_entry", "entity_id": f"d{seq}", "change_seq": seq, "deleted_at": deleted_at}
+
+def test_token_round_trip():
+    assert decode_sync_token(encode_sync_token(42)) == 42
+    assert decode_sync_token(None) == 0
+    with pytest.raises(InvalidSyncToken):
+        decode_sync_token("not-a-token")
+
+def test_entries_and_tombstones_merge_in_sequence_order():
+    page = build_sync_page(0, [entry(1), entry(4)], [tombstone(2), tombstone(3)], {"change_seq": 0}, 10, SETTLED_BEFORE)
+    assert [row["id"] for row in page["entries"]] == ["e1", "e4"]
+    assert [row["id"] for row in page["deleted"]] == ["d2", "d3"]
+    assert not page["has_more"]
+    assert decode_sync_token(page["sync_token"]) == 4
+
+def test_page_boundary_sets_cursor_to_last_row_shown():
+    page = build_sync_page(0, [entry(1), entry(3)], [tombstone(2)], {"change_seq": 9}, 2, SETTLED_BEFORE)
+    assert page["has_more"]
+    assert decode_sync_token(page["sync_token"]) == 2
+    # The profile change isn't covered until the last page
+    assert page["profile_changed"]
+
+def test_cursor_covers_profile_change_on_last_page():
+    page = build_sync_page(0, [entry(1)], [], {"change_seq": 7, "updated_at": OLD}, 10, SETTLED_BEFORE)
+    assert page["profile_changed"]
+    assert decode_sync_token(page["sync_token"]) == 7
+
+def test_unsettled_rows_are_returned_but_not_passed():
+    page = build_sync_page(0, [entry(1), entry(3, YOUNG), entry(4)], [], {"change_seq": 0}, 10, SETTLED_BEFORE)
+    assert [row["id"] for row in page["entries"]] == ["e1", "e3", "e4"]
+    assert decode_sync_token(page["sync_token"]) == 1
+    assert not page["has_more"]
+
+def test_unsettled_profile_change_is_not_passed():
+    page = build_sync_page(5, [], [], {"change_seq": 8, "updated_at": YOUNG}, 10, SETTLED_BEFORE)
+    assert page["profile_changed"]
+    assert decode_sync_token(page["sync_token"]) == 5
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from entry_journal import EntryJournal
+
+def entry(entry_id, user_id="user-1", timestamp="2026-01-01T12:00:00"):
+    return {"id": entry_id, "user_id": user_id, "timestamp": timestamp, "sugar_points": 3}
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = EntryJournal(str(tmp_path / "journal.sqlite3"), enabled=True, batch_size=2)
+    journal.open()
+    yield journal
+    if journal._db is not None:
+        journal._db.close()
+
+def test_flush_writes_batches_in_order_and_clears_journal(journal):
+    for entry_id in ("a", "b", "c"):
+        journal.append(entry(entry_id))
+    written = []
+
+    async def scenario():
+        return [await journal.flush_once(written.append) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [2, 1, 0]
+    assert [[row["id"] for row in batch] for batch in written] == [["a", "b"], ["c"]]
+    assert journal.pending_count() == 0
+
+def test_failed_flush_keeps_entries_for_retry(journal):
+    journal.append(entry("a"))
+
+    def failing_insert(batch):
+        raise RuntimeError("supabase unavailable")
+
+    written = []
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await journal.flush_once(failing_insert)
+        return await journal.flush_once(written.append)
+
+    assert asyncio.run(scenario()) == 1
+    assert [row["id"] for row in written[0]] == ["a"]
+    assert journal.pending_count() == 0
+
+def test_entries_survive_reopen(journal, tmp_path):
+    journal.append(entry("a"))
+    journal._db.close()
+    reopened = EntryJournal(str(tmp_path / "journal.sqlite3"), enabled=True)
+    reopened.open()
+    assert [row["id"] for row in reopened.pending_for_user("user-1")] == ["a"]
+    reopened._db.close()
+
+def test_merge_adds_pending_entries_in_range(journal):
+    journal.append(entry("a", timestamp="2026-01-01T12:00:00"))
+    journal.append(entry("b", timestamp="2026-01-02T12:00:00"))
+    rows = [{"id": "a", "timestamp": "2026-01-01T12:00:00"}]
+    merged = journal.merge("user-1", rows, "2026-01-01", "2026-01-03")
+    assert [row["id"] for row in merged] == ["a", "b"]
+    assert journal.merge("user-2", rows) == rows
+
+def test_discard_unflushed_entry(journal):
+    journal.append(entry("a"))
+    removed, maybe_stored = asyncio.run(journal.discard("user-1", "a"))
+    assert removed["id"] == "a"
+    assert not maybe_stored
+    assert journal.pending_count() == 0
+    assert asyncio.run(journal.discard("user-1", "a")) == (None, False)
+
+def test_discard_after_failed_flush_reports_maybe_stored(journal):
+    journal.append(entry("a"))
+
+    def insert_then_time_out(batch):
+        # The upsert reached the database, but the response never came back
+        raise TimeoutError("read timed out")
+
+    async def scenario():
+        with pytest.raises(TimeoutError):
+            await journal.flush_once(insert_then_time_out)
+        return await journal.discard("user-1", "a")
+
+    removed, maybe_stored = asyncio.run(scenario())
+    assert removed["id"] == "a"
+    assert maybe_stored
+
+def test_recovered_entries_may_already_be_stored(journal, tmp_path):
+    journal.append(entry("a"))
+    journal._db.close()
+    reopened = EntryJournal(str(tmp_path / "journal.sqlite3"), enabled=True)
+    reopened.open()
+    _, maybe_stored = asyncio.run(reopened.discard("user-1", "a"))
+    assert maybe_stored
+    reopened._db.close()
+
+def test_discard_waits_for_in_flight_flush(journal):
+    journal.append(entry("a"))
+
+    async def scenario():
+        journal._batch_done = asyncio.Event()
+        started = asyncio.Event()
+        release = asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        def slow_insert(batch):
+            loop.call_soon_threadsafe(started.set)
+            asyncio.run_coroutine_threadsafe(release.wait(), loop).result()
+
+        flush = asyncio.ensure_future(journal.flush_once(slow_insert))
+        await started.wait()
+        discard = asyncio.ensure_future(journal.discard("user-1", "a"))
+        await asyncio.sleep(0.01)
+        assert not discard.done()
+        release.set()
+        return await flush, await discard
+
+    flushed, discarded = asyncio.run(scenario())
+    assert flushed == 1
+    # Already written: the caller deletes the stored row instead
+    assert discarded == (None, False)
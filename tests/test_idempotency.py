@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from idempotency import IdempotencyConflict, IdempotencyStore, request_fingerprint
+
+def counting_handler(result):
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return result
+
+    return handler, calls
+
+def test_retry_replays_stored_response():
+    async def scenario():
+        store = IdempotencyStore()
+        handler, calls = counting_handler({"id": "entry-1"})
+        fingerprint = request_fingerprint({"name": "apple"})
+        first = await store.run("food_entry", "user-1", "key-1", fingerprint, handler)
+        second = await store.run("food_entry", "user-1", "key-1", fingerprint, handler)
+        return first, second, calls, store
+
+    first, second, calls, store = asyncio.run(scenario())
+    assert first == ({"id": "entry-1"}, False)
+    assert second == ({"id": "entry-1"}, True)
+    assert len(calls) == 1
+    assert store.stats()["replays"] == 1
+
+def test_keys_are_scoped_per_user():
+    async def scenario():
+        store = IdempotencyStore()
+        handler, calls = counting_handler("ok")
+        await store.run("food_entry", "user-1", "key-1", "fp", handler)
+        _, replayed = await store.run("food_entry", "user-2", "key-1", "fp", handler)
+        return replayed, calls
+
+    replayed, calls = asyncio.run(scenario())
+    assert not replayed
+    assert len(calls) == 2
+
+def test_concurrent_duplicate_shares_in_flight_result():
+    async def scenario():
+        store = IdempotencyStore()
+        release = asyncio.Event()
+        calls = []
+
+        async def handler():
+            calls.append(1)
+            await release.wait()
+            return "created"
+
+        first = asyncio.ensure_future(store.run("food_entry", "user-1", "key-1", "fp", handler))
+        second = asyncio.ensure_future(store.run("food_entry", "user-1", "key-1", "fp", handler))
+        await asyncio.sleep(0)
+        in_flight = store.stats()["in_flight"]
+        release.set()
+        return await first, await second, calls, in_flight
+
+    first, second, calls, in_flight = asyncio.run(scenario())
+    assert in_flight == 1
+    assert first == ("created", False)
+    assert second == ("created", True)
+    assert len(calls) == 1
+
+def test_in_flight_key_with_different_body_conflicts():
+    async def scenario():
+        store = IdempotencyStore()
+        release = asyncio.Event()
+
+        async def handler():
+            await release.wait()
+            return "created"
+
+        first = asyncio.ensure_future(store.run("food_entry", "user-1", "key-1", "fp-a", handler))
+        await asyncio.sleep(0)
+        with pytest.raises(IdempotencyConflict):
+            await store.run("food_entry", "user-1", "key-1", "fp-b", handler)
+        release.set()
+        return await first, store
+
+    first, store = asyncio.run(scenario())
+    assert first == ("created", False)
+    assert store.stats()["conflicts"] == 1
+
+def test_failure_is_not_stored():
+    async def scenario():
+        store = IdempotencyStore()
+        attempts = []
+
+        async def handler():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("database unavailable")
+            return "created"
+
+        with pytest.raises(RuntimeError):
+            await store.run("food_entry", "user-1", "key-1", "fp", handler)
+        return await store.run("food_entry", "user-1", "key-1", "fp", handler), attempts
+
+    result, attempts = asyncio.run(scenario())
+    assert result == ("created", False)
+    assert len(attempts) == 2
+
+def test_overlong_key_is_rejected():
+    async def scenario():
+        handler, _ = counting_handler("ok")
+        await IdempotencyStore().run("food_entry", "user-1", "k" * 256, "fp", handler)
+
+    with pytest.raises(ValueError):
+        asyncio.run(scenario())
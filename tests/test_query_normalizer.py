@@ -0,0 +1,44 @@
+import pytest
+
+from query_normalizer import canonicalize_query
+
+@pytest.mark.parametrize("query, expected", [
+    ("  Red APPLES ", "apple"),
+    ("pop", "cola"),
+    ("soda", "cola"),
+    ("crisps", "potato chip"),
+    ("greek yoghurt", "greek yogurt"),
+])
+def test_whole_query_synonyms(query, expected):
+    assert canonicalize_query(query) == expected
+
+@pytest.mark.parametrize("query, expected", [
+    ("pop tarts", "pop tart"),
+    ("soda bread", "soda bread"),
+    ("apple crisp", "apple crisp"),
+    ("biscuits and gravy", "biscuit gravy"),
+])
+def test_single_word_synonyms_leave_longer_queries_alone(query, expected):
+    assert canonicalize_query(query) == expected
+
+def test_phrase_synonym_inside_longer_query():
+    assert canonicalize_query("minced beef pie") == "ground beef pie"
+
+@pytest.mark.parametrize("query, expected", [
+    ("cookies", "cookie"),
+    ("brownies", "brownie"),
+    ("pies", "pie"),
+    ("strawberries", "strawberry"),
+    ("tomatoes", "tomato"),
+    ("hummus", "hummus"),
+])
+def test_plurals(query, expected):
+    assert canonicalize_query(query) == expected
+
+def test_synonym_keys_are_canonicalized():
+    assert canonicalize_query("rolled oats") == "oatmeal"
+    assert canonicalize_query("Rolled Oats with milk") == "oatmeal milk"
+
+def test_stop_word_only_and_empty_queries():
+    assert canonicalize_query("the") == "the"
+    assert canonicalize_query("   ") == ""
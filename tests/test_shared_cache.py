@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+# shared_cache keeps its in-memory tier in a cachetools TTLCache
+pytest.importorskip("cachetools")
+
+from shared_cache import _MISSING, SharedCache, TieredCache
+
+@pytest.fixture
+def workers(tmp_path):
+    """
+    Two SharedCache instances on one file, as two worker processes would have
+    """
+    path = str(tmp_path / "shared" / "cache.sqlite3")
+    first, second = SharedCache(path), SharedCache(path)
+    yield (first, TieredCache("profiles", 100, 60, first)), (second, TieredCache("profiles", 100, 60, second))
+    for shared in (first, second):
+        for db in (shared._reader, shared._writer):
+            if db is not None:
+                db.close()
+
+def test_read_falls_through_to_shared_tier_and_populates_memory(workers):
+    (_, writer), (_, reader) = workers
+    writer.set("user-1", {"name": "Ada"})
+    assert "user-1" not in reader.local
+    assert reader.get("user-1") == {"name": "Ada"}
+    assert reader.local["user-1"] == {"name": "Ada"}
+    reader.get("user-1")
+    assert reader.stats()["local_hits"] == 1
+
+def test_miss_returns_default(workers):
+    _, (shared, reader) = workers
+    assert reader.get("missing", "default") == "default"
+    assert shared.stats()["misses"] == 1
+
+def test_expired_shared_entry_is_a_miss(workers):
+    (shared, _), _ = workers
+    shared.set("profiles", "user-1", {"name": "Ada"}, ttl_seconds=-1)
+    assert shared.get("profiles", "user-1") is _MISSING
+    assert shared.stats()["hits"] == 0
+
+def test_invalidation_reaches_other_workers_memory(workers):
+    (_, writer), (reader_shared, reader) = workers
+    writer.set("user-1", {"name": "Ada"})
+    assert reader.get("user-1") == {"name": "Ada"}
+    writer.invalidate("user-1")
+    # Still in the other worker's memory until it picks up the invalidation
+    assert reader.local.get("user-1") == {"name": "Ada"}
+    asyncio.run(reader_shared.sync_once())
+    assert reader.get("user-1") is None
+
+def test_replace_drops_stale_copies_elsewhere(workers):
+    (_, writer), (reader_shared, reader) = workers
+    writer.set("user-1", {"name": "Ada"})
+    reader.get("user-1")
+    writer.replace("user-1", {"name": "Ada Lovelace"})
+    asyncio.run(reader_shared.sync_once())
+    assert reader.get("user-1") == {"name": "Ada Lovelace"}
+
+def test_queued_writes_are_visible_locally_before_sync(workers):
+    (writer_shared, writer), (_, reader) = workers
+
+    async def scenario():
+        writer_shared.start()
+        try:
+            writer.set("user-1", {"name": "Ada"})
+            writer.local.clear()
+            own_read = writer.get("user-1")
+            other_read = reader.get("user-1")
+        finally:
+            await writer_shared.stop()
+        return own_read, other_read
+
+    own_read, other_read = asyncio.run(scenario())
+    assert own_read == {"name": "Ada"}
+    # Not written to SQLite until the sync task ran; stop() flushed it
+    assert other_read is None
+    assert reader.get("user-1") == {"name": "Ada"}
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+# typeahead imports the food catalog, which pulls in the Passio client and nutrient estimator
+for module in ("cachetools", "httpx", "numpy"):
+    pytest.importorskip(module)
+
+from typeahead import TypeaheadService
+
+def food(name):
+    return {"id": name.lower().replace(" ", "_"), "name": name}
+
+class StubFetcher:
+    def __init__(self, results, cacheable=True, local=None):
+        self.results = results
+        self.cacheable = cacheable
+        self.local = local
+        self.prefixes = []
+
+    async def __call__(self, prefix, limit):
+        self.prefixes.append(prefix)
+        return self.results, self.cacheable, self.local
+
+def service():
+    return TypeaheadService(debounce_seconds=0)
+
+def test_exact_prefix_is_served_from_cache():
+    typeahead = service()
+    fetch = StubFetcher([food("Apple")], local=[food("Apple")])
+
+    async def scenario():
+        first = await typeahead.suggest("client", "ap", 8, fetch)
+        second = await typeahead.suggest("client", "AP ", 8, fetch)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == ([food("Apple")], "upstream")
+    assert second == ([food("Apple")], "cache")
+    assert fetch.prefixes == ["ap"]
+
+def test_longer_prefix_served_locally_while_passio_is_queried():
+    typeahead = service()
+    passio_only = food("Applebee's Burger")
+    fetch = StubFetcher([food("Apple"), passio_only, food("Apricot")], local=[food("Apple"), food("Apricot")])
+
+    async def scenario():
+        await typeahead.suggest("client", "ap", 8, fetch)
+        fetch.results = [food("Apple Pie"), food("Apple")]
+        served = await typeahead.suggest("client", "app", 8, fetch)
+        # Let the background lookup run
+        await asyncio.sleep(0.01)
+        again = await typeahead.suggest("client", "app", 8, fetch)
+        return served, again
+
+    served, again = asyncio.run(scenario())
+    assert served[1] == "prefix_cache"
+    assert [item["name"] for item in served[0]] == ["Apple", "Applebee's Burger"]
+    assert fetch.prefixes == ["ap", "app"]
+    assert again == ([food("Apple Pie"), food("Apple")], "cache")
+
+def test_passio_results_alone_never_complete_a_prefix():
+    typeahead = service()
+    # Few results, but the catalog had more matches than the fetch limit
+    fetch = StubFetcher([food("Apple")], local=None)
+
+    async def scenario():
+        await typeahead.suggest("client", "ap", 8, fetch)
+        return await typeahead.suggest("client", "app", 8, fetch)
+
+    results, source = asyncio.run(scenario())
+    assert source == "upstream"
+    assert fetch.prefixes == ["ap", "app"]
+
+def test_uncacheable_results_are_refetched():
+    typeahead = service()
+    fetch = StubFetcher([food("Apple")], cacheable=False, local=[food("Apple")])
+
+    async def scenario():
+        await typeahead.suggest("client", "ap", 8, fetch)
+        return await typeahead.suggest("client", "ap", 8, fetch)
+
+    assert asyncio.run(scenario())[1] == "upstream"
+    assert fetch.prefixes == ["ap", "ap"]
+
+def test_background_lookup_dropped_when_client_types_again():
+    typeahead = TypeaheadService(debounce_seconds=0.05)
+    fetch = StubFetcher([food("Apple")], local=[food("Apple")])
+
+    async def scenario():
+        typeahead._cache["ap"] = ((food("Apple"),), (food("Apple"),))
+        await typeahead.suggest("client", "app", 8, fetch)
+        # The next keystroke supersedes the "app" lookup before its debounce ends
+        await typeahead.suggest("client", "appl", 8, fetch)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(scenario())
+    assert fetch.prefixes == ["appl"]
+
+def test_short_prefix_skips_lookup():
+    fetch = StubFetcher([])
+    assert asyncio.run(service().suggest("client", "a", 8, fetch)) == ([], "too_short")
+    assert fetch.prefixes == []